@@ -0,0 +1,27 @@
+"""
+ASGI config for app project.
+
+Django 2.1 has no ASGI handler. Viewset actions listed in their
+async_actions are served natively by core.asgi, everything else goes
+through the WSGI application on a thread pool sized like the threaded
+WSGI workers.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, served with ``gunicorn -c python:app.gunicorn_conf``
+and ``SERVING_MODE=async``.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import AsyncViewsApplication
+from core.serving import UPLOAD_THREADS, env_int, serving_profile
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = AsyncViewsApplication(
+    get_wsgi_application(),
+    max_threads=env_int('ASGI_THREADS', serving_profile('async')['threads']),
+    upload_threads=env_int('ASGI_UPLOAD_THREADS', UPLOAD_THREADS),
+)
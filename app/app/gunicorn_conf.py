@@ -0,0 +1,57 @@
+"""
+Gunicorn config for app project.
+
+Run from the project directory with::
+
+    gunicorn -c python:app.gunicorn_conf
+
+SERVING_MODE picks threaded WSGI workers (``sync``, the default) or
+uvicorn workers serving ``app.asgi`` (``async``). Worker counts come from
+the CPUs available and threads from the database connections available,
+see core.serving. Send HUP to the master for a graceful reload.
+"""
+
+import os
+
+from core.serving import env_flag, env_int, serving_profile
+
+profile = serving_profile()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+wsgi_app = profile['wsgi_app']
+worker_class = profile['worker_class']
+workers = profile['workers']
+threads = profile['threads']
+
+# Tells the workers' settings how many processes share the caches
+os.environ['SERVER_PROCESSES'] = str(workers)
+
+# Requests slower than this are killed, the workers get graceful_timeout
+# to finish in-flight requests on HUP, TERM or max_requests
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Recycle workers now and then so leaks cannot build up, with jitter so
+# they do not all restart at once
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Load the application in each worker so a HUP reload picks up new code
+preload_app = False
+reload = env_flag('GUNICORN_RELOAD')
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    server.log.info(
+        'Serving %(wsgi_app)s with %(workers)s %(mode)s workers of '
+        '%(threads)s threads', profile
+    )
+
+
+def on_reload(server):
+    server.log.info('Reloading workers gracefully')
@@ -1,5 +1,7 @@
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -26,11 +28,13 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'users',
-    'core',
-    'recipes',
+    'core.apps.CoreConfig',
+    'recipes.apps.RecipesConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.QueryDebugMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,6 +42,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -63,16 +68,103 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# DB_POOL_MODE is 'persistent' (a connection per thread kept for
+# DB_CONN_MAX_AGE seconds), 'pool' (an in-process pool shared by the
+# threads) or 'pgbouncer' (persistent connections to pgbouncer running
+# in transaction pooling mode), see core/db/base.py
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'persistent')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        # Pooled connections go back to the pool after every request
+        'CONN_MAX_AGE': 0 if DB_POOL_MODE == 'pool' else
+        int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS':
+            os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        # Transaction pooling cannot keep cursors open between queries
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
+        'POOL': {
+            'MODE': DB_POOL_MODE,
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 3600)
+            ),
+        },
+    }
+}
+
+# Read replicas: comma separated hosts sharing the primary's settings.
+# Safe requests to the recipe API read from a random replica, unless the
+# user wrote in the last DB_REPLICA_PIN_SECONDS, see core/routers.py
+
+REPLICA_DATABASES = []
+for index, host in enumerate(filter(None, (
+        host.strip() for host in
+        os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+)), 1):
+    DATABASES[f'replica{index}'] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+    )
+    REPLICA_DATABASES.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Server processes running this project, exported by app/gunicorn_conf.py.
+# LocMemCache is private to each process, so with more than one process
+# it needs replacing with a shared CACHE_BACKEND such as memcached:
+# replica routing refuses to start without one, since the pins of writes
+# made by other processes would go unseen (core/routers.py), and tag and
+# ingredient lists are not cached, since their invalidations would go
+# unseen for up to the cache timeout (recipes/cache.py)
+SERVER_PROCESSES = int(os.environ.get('SERVER_PROCESSES', 1))
+
+# Background tasks
+
+TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND', 'thread')
+TASK_QUEUE_WORKERS = int(os.environ.get('TASK_QUEUE_WORKERS', 2))
+
+# Query debugging: slow query log and N+1 warnings per request
+
+QUERY_DEBUG = os.environ.get('QUERY_DEBUG', str(int(DEBUG))) == '1'
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+NPLUSONE_THRESHOLD = int(os.environ.get('NPLUSONE_THRESHOLD', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -91,6 +183,42 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/2.1/topics/auth/passwords/
+
+# New passwords are hashed with PASSWORD_HASHER, passwords stored with
+# one of the others are rehashed with it on the next login
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+if PASSWORD_HASHER not in PASSWORD_HASHER_CLASSES:
+    raise ImproperlyConfigured(
+        f'PASSWORD_HASHER must be one of {sorted(PASSWORD_HASHER_CLASSES)}, '
+        f'not {PASSWORD_HASHER!r}'
+    )
+# Hashers Django accepted before, kept so their passwords still verify
+# and get rehashed on login
+LEGACY_PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in sorted(PASSWORD_HASHER_CLASSES.items())
+    if name != PASSWORD_HASHER
+] + LEGACY_PASSWORD_HASHERS
+# Processes hashing passwords outside the request threads, 0 hashes inline
+PASSWORD_HASHING_PROCESSES = int(
+    os.environ.get('PASSWORD_HASHING_PROCESSES', 0)
+)
+
+# The test runner hashes with these, strong hashing only slows tests down
+TEST_RUNNER = 'core.testing.TestRunner'
+TEST_PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+] + PASSWORD_HASHERS
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
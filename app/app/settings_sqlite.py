@@ -0,0 +1,27 @@
+"""
+Settings for running and testing the project without PostgreSQL.
+
+Two SQLite databases stand in for the primary and a read replica. Nothing
+replicates between them, so reads routed to the replica only see rows
+written to it directly, which makes the routing easy to observe::
+
+    python manage.py test --settings=app.settings_sqlite
+"""
+
+import os
+
+from app.settings import *  # noqa
+from app.settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'primary.sqlite3'),
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+    },
+}
+
+REPLICA_DATABASES = ['replica']
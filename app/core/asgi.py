@@ -0,0 +1,224 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.conf import settings
+from django.core import signals
+from django.core.handlers.wsgi import get_script_name
+from django.urls import Resolver404, resolve, set_script_prefix
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """Run one WSGI request on the adapter's thread pool"""
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        # asgiref runs every request on one shared thread by default,
+        # which would serialize the whole worker
+        await asyncio.get_event_loop().run_in_executor(
+            self.executor, self.run_wsgi_app_sync, body
+        )
+
+    def run_wsgi_app_sync(self, body):
+        """Run the WSGI application and send its response"""
+        environ = self.build_environ(self.scope, body)
+        result = self.wsgi_application(environ, self.start_response)
+        # Closing the response sends request_finished, which releases
+        # the request's database connections
+        try:
+            remaining = None
+            for output in result:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                    remaining = self.response_content_length
+                if remaining is not None:
+                    output = output[:remaining]
+                    remaining -= len(output)
+                self.sync_send({'type': 'http.response.body',
+                                'body': output, 'more_body': True})
+                if remaining == 0:
+                    break
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            self.sync_send({'type': 'http.response.body'})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi running up to max_threads requests at once"""
+
+    def __init__(self, wsgi_application, max_threads):
+        super().__init__(wsgi_application)
+        self.max_threads = max_threads
+        self.executor = ThreadPoolExecutor(max_workers=max_threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        await ThreadedWsgiToAsgiInstance(
+            self.wsgi_application, self.executor
+        )(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """Let in-flight requests finish before the worker exits"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Wait off the loop, in-flight requests still send on it
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.shutdown
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def async_lane(scope):
+    """
+    Return the thread pool lane named in the async_actions of the
+    viewset action a request resolves to, None for every other request.
+    """
+    if scope['type'] != 'http':
+        return None
+    path = scope['path']
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(scope['method'].lower())
+    async_actions = getattr(getattr(match.func, 'cls', None),
+                            'async_actions', None) or {}
+    return async_actions.get(action)
+
+
+async def receive_body(receive, executor, spool_size):
+    """
+    Receive a request body into a temporary file, writing to disk on
+    executor once it outgrows spool_size. Returns None if the client
+    disconnected first.
+    """
+    body = SpooledTemporaryFile(max_size=spool_size)
+    loop = asyncio.get_event_loop()
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > spool_size:
+            await loop.run_in_executor(executor, body.write, chunk)
+        else:
+            body.write(chunk)
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+    return body
+
+
+def build_environ(scope, body):
+    """Return the WSGI environ of an ASGI HTTP request"""
+    instance = WsgiToAsgiInstance(None)
+    instance.scope = scope
+    return instance.build_environ(scope, body)
+
+
+def response_start(response):
+    """Return the ASGI message starting a Django response"""
+    headers = [(name.lower().encode('latin1'), value.encode('latin1'))
+               for name, value in response.items()]
+    headers += [(b'set-cookie', cookie.output(header='').strip()
+                 .encode('latin1'))
+                for cookie in response.cookies.values()]
+    return {'type': 'http.response.start',
+            'status': response.status_code, 'headers': headers}
+
+
+class AsyncViewsApplication(ThreadedWsgiToAsgi):
+    """
+    Serve the viewset actions listed in their async_actions natively.
+
+    The request body is received and the response sent on the event
+    loop, so slow clients hold no thread. Only Django's handling of the
+    request runs on a thread, from the pool of the action's lane:
+    'orm' is shared with the WSGI adapter serving every other request,
+    'upload' keeps slow image saves from starving the reads.
+    """
+
+    def __init__(self, wsgi_application, max_threads, upload_threads):
+        super().__init__(wsgi_application, max_threads)
+        self.lanes = {
+            'orm': self.executor,
+            'upload': ThreadPoolExecutor(max_workers=upload_threads),
+        }
+
+    async def __call__(self, scope, receive, send):
+        lane = async_lane(scope)
+        if lane is None:
+            await super().__call__(scope, receive, send)
+            return
+
+        executor = self.lanes[lane]
+        body = await receive_body(receive, executor,
+                                  settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        if body is None:
+            return
+        loop = asyncio.get_event_loop()
+        with body:
+            message = await loop.run_in_executor(
+                executor, self.handle, build_environ(scope, body), send,
+                loop
+            )
+        if message is not None:
+            await send(message[0])
+            await send({'type': 'http.response.body', 'body': message[1]})
+
+    def handle(self, environ, send, loop):
+        """
+        Handle a request on a lane thread. Returns the response start
+        and body to send, or None once a streaming response was sent.
+        """
+        handler = self.wsgi_application
+        set_script_prefix(get_script_name(environ))
+        signals.request_started.send(sender=handler.__class__,
+                                     environ=environ)
+        response = handler.get_response(handler.request_class(environ))
+        # Closing sends request_finished, which must run on the thread
+        # holding the request's database connections
+        try:
+            if not response.streaming:
+                return response_start(response), response.content
+
+            def send_sync(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            send_sync(response_start(response))
+            for chunk in response:
+                send_sync({'type': 'http.response.body', 'body': chunk,
+                           'more_body': True})
+            send_sync({'type': 'http.response.body'})
+        finally:
+            response.close()
+
+    def shutdown(self):
+        for executor in self.lanes.values():
+            executor.shutdown()
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """
+    Two tier token -> user cache.
+
+    A bounded in-process LRU answers most lookups. An optional shared
+    Django cache lets workers reuse each other's lookups and invalidation.
+    Entries expire after a short TTL, which bounds how long another
+    process may keep serving a user that was changed elsewhere.
+    """
+
+    def __init__(self, max_size=1024, local_ttl=30, shared_ttl=300,
+                 shared_alias='default'):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self.shared_alias = shared_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    @staticmethod
+    def shared_key(key):
+        return f'auth:token:{key}'
+
+    def get(self, key):
+        """Return the cached user for a token key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return user
+                del self._entries[key]
+
+        if self.shared is None:
+            return None
+        user = self.shared.get(self.shared_key(key))
+        if user is not None:
+            self._set_local(key, user)
+        return user
+
+    def set(self, key, user):
+        """Cache the user owning a token key"""
+        self._set_local(key, user)
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), user, self.shared_ttl)
+
+    def _set_local(self, key, user):
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.local_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        """Forget the given token keys"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self.shared_key(key) for key in keys])
+
+    def invalidate_user(self, user_id):
+        """Forget every token belonging to a user"""
+        with self._lock:
+            keys = [key for key, (user, expires_at) in self._entries.items()
+                    if user.pk == user_id]
+        keys.extend(
+            Token.objects.filter(user_id=user_id).values_list(
+                'key', flat=True
+            )
+        )
+        self.invalidate(*set(keys))
+
+    def clear(self):
+        """Forget every locally cached token"""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedUser(namedtuple('CachedUser', ('pk', 'fields'))):
+    """
+    A user's field values as kept in the token cache, less the password
+    so its hash is never copied into the shared cache.
+    """
+    __slots__ = ()
+    uncached_fields = ('password',)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.pk, tuple(
+            (field.attname, getattr(user, field.attname))
+            for field in user._meta.concrete_fields
+            if field.attname not in cls.uncached_fields
+        ))
+
+    def build(self):
+        """
+        Return a new user for one request, so requests never share an
+        instance. The password is deferred and only loaded when used.
+        """
+        names, values = zip(*self.fields)
+        return get_user_model().from_db(DEFAULT_DB_ALIAS, names, values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that avoids the token query on repeat requests"""
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            self.cache.set(key, CachedUser.from_user(user))
+            return user, token
+
+        user = cached.build()
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, Token(key=key, user=user)
@@ -0,0 +1,153 @@
+"""
+PostgreSQL backend reusing connections, ENGINE 'core.db'.
+
+POOL['MODE'] in the database settings picks how connections are reused:
+
+- persistent: every thread keeps its own connection for CONN_MAX_AGE
+- pool: threads share an in-process pool of at most POOL['MAX_SIZE']
+  connections, taken when a request first queries and returned when
+  Django closes the connection at the end of it (CONN_MAX_AGE = 0)
+- pgbouncer: connections go to pgbouncer, which does the pooling
+
+CONN_HEALTH_CHECKS pings reused connections before their first query
+in a request and reconnects if the database went away.
+"""
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+from core import metrics
+from core.db.pool import ConnectionPool, PoolTimeout
+
+POOL_MODES = ('persistent', 'pool', 'pgbouncer')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, options, check=None):
+    """Return this process's pool for key, creating it on first use"""
+    key = (os.getpid(), key)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                connect,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_idle=options.get('MAX_IDLE', 300),
+                max_lifetime=options.get('MAX_LIFETIME', 3600),
+                check=check,
+            )
+        return _pools[key]
+
+
+def close_pools():
+    """Close the idle connections of every pool in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def is_usable(connection):
+    """Check a raw psycopg2 connection still reaches the database"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseCreation(base.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would stop the database being dropped
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection with health checks and optional pooling"""
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+        mode = self.pool_options.get('MODE', 'persistent')
+        if mode not in POOL_MODES:
+            raise ImproperlyConfigured(
+                f'POOL MODE must be one of {POOL_MODES}, not {mode!r}'
+            )
+
+    @property
+    def pool_options(self):
+        return self.settings_dict.get('POOL') or {}
+
+    @property
+    def pooled(self):
+        return self.pool_options.get('MODE') == 'pool'
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_new_connection(self, conn_params):
+        if not self.pooled:
+            return super().get_new_connection(conn_params)
+
+        self.pool = get_pool(
+            (self.alias, repr(sorted(conn_params.items()))),
+            lambda: base.Database.connect(**conn_params),
+            self.pool_options,
+            check=is_usable if self.health_checks else None,
+        )
+        try:
+            connection, waited = self.pool.acquire()
+        except PoolTimeout as exc:
+            raise OperationalError(str(exc)) from exc
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            request_metrics.add('pool', waited)
+
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get('isolation_level',
+                                           connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        connection, pool, self.pool = self.connection, self.pool, None
+        discard = bool(connection.closed)
+        if not discard and connection.get_transaction_status() != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except base.Database.Error:
+                discard = True
+        pool.release(connection, discard)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if self.connection is not None and self.health_checks and \
+                not self.health_check_done and not self.in_atomic_block:
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Check the connection again before the next request uses it
+        self.health_check_done = False
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free in time"""
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of DB-API connections shared by a process's threads.
+
+    Idle connections are reused newest first, so the oldest ones are
+    left to pass max_idle and be closed when traffic drops.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10, max_idle=300,
+                 max_lifetime=3600, check=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._created = {}
+        self._size = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+
+    def acquire(self):
+        """Return a connection and the seconds spent waiting for it"""
+        start = time.perf_counter()
+        while True:
+            connection, waited = self._checkout(start)
+            if connection is None:
+                break
+            if self.check is None or self.check(connection):
+                return connection, waited
+            self._discard(connection)
+
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created[connection] = time.monotonic()
+        return connection, waited
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if discard"""
+        with self._condition:
+            if discard or self._expired(connection):
+                connection = self._forget(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._condition.notify()
+        if connection is not None:
+            close_quietly(connection)
+
+    def close_all(self):
+        """Close every idle connection, in-use ones close on release"""
+        with self._condition:
+            idle = [self._forget(connection)
+                    for connection, released in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            close_quietly(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                'waits': self.waits,
+                'wait_ms': round(self.wait_time * 1000, 3),
+                'timeouts': self.timeouts,
+            }
+
+    def _checkout(self, start):
+        """
+        Take an idle connection, or reserve room for a new one and
+        return None, waiting up to timeout while the pool is full.
+        """
+        deadline = start + self.timeout
+        expired = []
+        try:
+            with self._condition:
+                while True:
+                    expired.extend(self._prune())
+                    if self._idle:
+                        connection = self._idle.pop()[0]
+                        if self._expired(connection):
+                            expired.append(self._forget(connection))
+                            continue
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection = None
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'No database connection free after '
+                            f'{self.timeout}s, all {self.max_size} in use'
+                        )
+                    self._condition.wait(remaining)
+                waited = time.perf_counter() - start
+                if waited > 0.001:
+                    self.waits += 1
+                    self.wait_time += waited
+                return connection, waited
+        finally:
+            for connection in expired:
+                close_quietly(connection)
+
+    def _prune(self):
+        """Drop the connections idle for longer than max_idle"""
+        now = time.monotonic()
+        expired = []
+        while self._idle and now - self._idle[0][1] >= self.max_idle:
+            expired.append(self._forget(self._idle.popleft()[0]))
+        return expired
+
+    def _expired(self, connection):
+        created = self._created.get(connection, time.monotonic())
+        return time.monotonic() - created >= self.max_lifetime
+
+    def _forget(self, connection):
+        self._created.pop(connection, None)
+        self._size -= 1
+        return connection
+
+    def _discard(self, connection):
+        with self._condition:
+            self._forget(connection)
+            self._condition.notify()
+        close_quietly(connection)
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
@@ -0,0 +1,353 @@
+import json
+import platform
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, \
+    WSGIRequestHandler, get_internal_wsgi_application
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.search import update_search_vectors
+
+PASSWORD = 'benchmark-pass'
+DISHES = ('soup', 'salad', 'curry', 'stew', 'pie', 'risotto', 'tacos',
+          'noodles', 'omelette', 'pancakes', 'burger', 'lasagne')
+FLAVOURS = ('spicy', 'smoky', 'lemon', 'garlic', 'herb', 'sweet',
+            'roasted', 'creamy', 'tomato', 'mushroom', 'chicken', 'tofu')
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+POOL_WAIT_RE = re.compile(r'pool;dur=([\d.]+)')
+
+
+def percentile(values, percent):
+    """Return the nearest rank percentile of sorted values"""
+    if not values:
+        return None
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class InProcessDriver:
+    """Send requests through Django's test client"""
+    mode = 'inprocess'
+
+    def __init__(self, host):
+        self.client = Client(HTTP_HOST=host)
+
+    def __call__(self, method, path, token=None, data=None):
+        extra = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        response = self.client.generic(
+            method, path,
+            data=json.dumps(data) if data is not None else '',
+            content_type='application/json',
+            **extra
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code, response.get('Server-Timing', '')
+
+
+class HttpDriver:
+    """Send requests to a running server over HTTP"""
+    mode = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def __call__(self, method, path, token=None, data=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(data).encode('utf-8') if data else None,
+            headers=headers,
+            method=method
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status, response.headers.get(
+                    'Server-Timing', ''
+                )
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers.get('Server-Timing', '')
+
+
+class Command(BaseCommand):
+    """Django command to load test the API and report latency figures."""
+    help = ('Seed users and recipes, drive the API in-process and over '
+            'HTTP, and print throughput, latency and query counts as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Tags and ingredients per user')
+        parser.add_argument('--fan-out', type=int, default=4,
+                            help='Tags and ingredients per recipe')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint and mode')
+        parser.add_argument('--mode', choices=('inprocess', 'http', 'both'),
+                            default='both')
+        parser.add_argument('--url',
+                            help='Base URL of a running server to load '
+                                 'test instead of a local one')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--host',
+                            help='Host header of in-process requests, '
+                                 'defaults to the first allowed host')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only run the named endpoints')
+        parser.add_argument('--output', help='Write the report to a file')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        users = self._seed(options)
+        try:
+            endpoints = self._endpoints(options['endpoints'])
+            plans = {name: self._plan(build, users, options['requests'])
+                     for name, build in endpoints.items()}
+
+            results = []
+            if options['mode'] in ('inprocess', 'both'):
+                driver = InProcessDriver(options['host'] or self._host())
+                results += self._run(driver, plans, concurrency=1)
+            if options['mode'] in ('http', 'both'):
+                with self._server(options) as base_url:
+                    results += self._run(HttpDriver(base_url), plans,
+                                         options['concurrency'])
+        finally:
+            if not options['keep']:
+                self._cleanup(users)
+
+        report = json.dumps(OrderedDict((
+            ('timestamp', time.time()),
+            ('python', platform.python_version()),
+            ('django', django.get_version()),
+            ('config', OrderedDict(
+                (key, options[key]) for key in
+                ('users', 'recipes', 'tags', 'fan_out', 'requests', 'mode',
+                 'concurrency', 'seed')
+            )),
+            ('results', results),
+        )), indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        self.stdout.write(report)
+
+    def _host(self):
+        """Return a host name the test client's requests are allowed on"""
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*' and not host.startswith('.'):
+                return host
+        return 'localhost'
+
+    def _seed(self, options):
+        """Create users owning recipes with random tags and ingredients"""
+        run = f'{time.time():.0f}-{random.randint(0, 10 ** 6)}'
+        password = make_password(PASSWORD)
+        users = []
+        for index in range(options['users']):
+            user = get_user_model().objects.build_user(
+                f'bench-{run}-{index}@example.com', password
+            )
+            user.save()
+            tag_ids = self._seed_attrs(Tag, user, options['tags'])
+            ingredient_ids = self._seed_attrs(Ingredient, user,
+                                              options['tags'])
+            Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=f'{random.choice(FLAVOURS).title()} '
+                          f'{random.choice(DISHES)}',
+                    time_minutes=random.randint(5, 120),
+                    price=f'{random.uniform(1, 50):.2f}',
+                    description=' '.join(random.sample(FLAVOURS, 4))
+                ) for _ in range(options['recipes'])
+            )
+            recipe_ids = list(Recipe.objects.filter(user=user).values_list(
+                'id', flat=True
+            ))
+            fan_out = min(options['fan_out'], options['tags'])
+            for field, ids in (('tag', tag_ids),
+                               ('ingredient', ingredient_ids)):
+                through = getattr(Recipe, f'{field}s').through
+                through.objects.bulk_create(
+                    through(recipe_id=recipe_id, **{f'{field}_id': pk})
+                    for recipe_id in recipe_ids
+                    for pk in random.sample(ids, fan_out)
+                )
+            update_search_vectors(recipe_ids)
+            users.append({
+                'email': user.email,
+                'token': Token.objects.create(user=user).key,
+                'recipe_ids': recipe_ids,
+                'tag_ids': tag_ids,
+                'pk': user.pk,
+            })
+        return users
+
+    def _seed_attrs(self, model, user, count):
+        model.objects.bulk_create(
+            model(user=user, name=f'{random.choice(FLAVOURS).title()} {i}')
+            for i in range(count)
+        )
+        return list(model.objects.filter(user=user).values_list(
+            'id', flat=True
+        ))
+
+    def _cleanup(self, users):
+        get_user_model().objects.filter(
+            pk__in=[user['pk'] for user in users]
+        ).delete()
+
+    def _endpoints(self, names):
+        """Return {name: build(user) -> (method, path, data, auth)}"""
+        recipes = reverse('recipes:recipe-list')
+        endpoints = OrderedDict((
+            ('recipe-list', lambda user: ('GET', recipes, None, True)),
+            ('recipe-filter', lambda user: (
+                'GET',
+                recipes + '?tags=' + ','.join(
+                    str(pk) for pk in random.sample(
+                        user['tag_ids'], min(2, len(user['tag_ids']))
+                    )
+                ),
+                None, True
+            )),
+            ('recipe-search', lambda user: (
+                'GET', f'{recipes}?search={random.choice(DISHES)}',
+                None, True
+            )),
+            ('recipe-detail', lambda user: (
+                'GET',
+                reverse('recipes:recipe-detail',
+                        args=[random.choice(user['recipe_ids'])]),
+                None, True
+            )),
+            ('tag-list', lambda user: (
+                'GET', reverse('recipes:tag-list'), None, True
+            )),
+            ('ingredient-list', lambda user: (
+                'GET', reverse('recipes:ingredient-list'), None, True
+            )),
+            ('tag-autocomplete', lambda user: (
+                'GET',
+                reverse('recipes:tag-autocomplete') + '?q=' +
+                random.choice(FLAVOURS)[:2],
+                None, True
+            )),
+            ('user-me', lambda user: (
+                'GET', reverse('users:me'), None, True
+            )),
+            ('user-token', lambda user: (
+                'POST', reverse('users:token'),
+                {'email': user['email'], 'password': PASSWORD}, False
+            )),
+        ))
+        if not names:
+            return endpoints
+        unknown = set(names) - set(endpoints)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {sorted(unknown)}')
+        return OrderedDict((name, endpoints[name]) for name in names)
+
+    def _plan(self, build, users, count):
+        """Return the requests to send, spread over the seeded users"""
+        plan = []
+        for _ in range(count):
+            user = random.choice(users)
+            method, path, data, auth = build(user)
+            plan.append((method, path, user['token'] if auth else None,
+                         data))
+        return plan
+
+    def _run(self, driver, plans, concurrency):
+        """Send every planned request and summarize each endpoint"""
+        results = []
+        for name, plan in plans.items():
+            def send(request):
+                start = time.perf_counter()
+                status, timing = driver(*request)
+                elapsed = (time.perf_counter() - start) * 1000
+                queries = QUERIES_RE.search(timing)
+                pool_wait = POOL_WAIT_RE.search(timing)
+                return (status, elapsed,
+                        int(queries.group(1)) if queries else None,
+                        float(pool_wait.group(1)) if pool_wait else None)
+
+            start = time.perf_counter()
+            if concurrency > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    samples = list(pool.map(send, plan))
+            else:
+                samples = [send(request) for request in plan]
+            wall = time.perf_counter() - start
+
+            latencies = sorted(sample[1] for sample in samples)
+            queries = [sample[2] for sample in samples
+                       if sample[2] is not None]
+            pool_waits = [sample[3] for sample in samples
+                          if sample[3] is not None]
+            results.append(OrderedDict((
+                ('endpoint', name),
+                ('mode', driver.mode),
+                ('requests', len(samples)),
+                ('errors', sum(1 for sample in samples
+                               if sample[0] >= 400)),
+                ('throughput_rps', round(len(samples) / wall, 2)),
+                ('p50_ms', round(percentile(latencies, 50), 3)),
+                ('p95_ms', round(percentile(latencies, 95), 3)),
+                ('p99_ms', round(percentile(latencies, 99), 3)),
+                ('queries_mean', round(sum(queries) / len(queries), 2)
+                 if queries else None),
+                ('queries_max', max(queries) if queries else None),
+                ('pool_wait_ms_mean',
+                 round(sum(pool_waits) / len(pool_waits), 3)
+                 if pool_waits else None),
+            )))
+        return results
+
+    @contextmanager
+    def _server(self, options):
+        """Yield the base URL of the server to load test"""
+        if options['url']:
+            yield options['url']
+            return
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.daemon_threads = True
+        server.set_app(get_internal_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f'http://127.0.0.1:{server.server_port}'
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,202 @@
+import io
+import json
+import os
+import platform
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.urls import reverse
+
+from core.management.commands import benchmark_api, benchmark_serving
+from core.management.commands.benchmark_api import percentile
+from core.serving import WORKER_CLASSES, serving_profile
+
+BOUNDARY = 'benchmark-boundary'
+
+
+def upload_body(size):
+    """Return a multipart image upload padded to about size bytes"""
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(image, format='JPEG')
+    # JPEG decoders ignore bytes after the end of image marker
+    padding = b'\0' * max(0, size - image.tell())
+    return (
+        f'--{BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="image"; '
+        f'filename="image.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image.getvalue() + padding + \
+        f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def slow_upload(base_url, path, token, body, seconds, pieces=20):
+    """POST an upload, trickling the body over seconds like a slow client"""
+    url = urlsplit(base_url)
+    with socket.create_connection((url.hostname, url.port), 60) as sock:
+        sock.sendall((
+            f'POST {path} HTTP/1.1\r\n'
+            f'Host: {url.hostname}:{url.port}\r\n'
+            f'Authorization: Token {token}\r\n'
+            f'Content-Type: multipart/form-data; boundary={BOUNDARY}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n'
+        ).encode())
+        step = -(-len(body) // pieces)
+        for start in range(0, len(body), step):
+            sock.sendall(body[start:start + step])
+            time.sleep(seconds / pieces)
+        response = b''
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            response += data
+    return int(response.split(b' ', 2)[1])
+
+
+class Command(benchmark_serving.Command):
+    """Django command to compare worker models under mixed traffic."""
+    help = ('Serve the project with threaded and async workers in turn, '
+            'keep slow clients uploading images while fast clients read '
+            'the recipe list, and print the results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', dest='modes',
+                            choices=sorted(WORKER_CLASSES),
+                            help='Only run the named serving modes')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Threads per worker, in both modes')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Seconds of traffic per mode')
+        parser.add_argument('--slow-clients', type=int, default=8,
+                            help='Clients uploading images slowly')
+        parser.add_argument('--slow-seconds', type=float, default=2,
+                            help='Seconds each slow upload takes to send')
+        parser.add_argument('--upload-size', type=int, default=256 * 1024,
+                            help='Bytes per uploaded image')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Clients reading the recipe list')
+        parser.add_argument('--users', type=int, default=4)
+        parser.add_argument('--recipes', type=int, default=20,
+                            help='Recipes per user')
+        parser.add_argument('--output', help='Write the report to a file')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and \
+                connection.is_in_memory_db():
+            raise CommandError('The servers cannot share an in-memory '
+                               'database, use PostgreSQL')
+
+        random.seed(options['seed'])
+        seeder = benchmark_api.Command()
+        users = seeder._seed(dict(options, tags=5, fan_out=2))
+        try:
+            results = []
+            for mode in options['modes'] or ('sync', 'async'):
+                profile = serving_profile(mode)
+                profile['workers'] = options['workers']
+                profile['threads'] = options['threads']
+                with self._server(profile, ASGI_UPLOAD_THREADS='2',
+                                  TASK_QUEUE_BACKEND='immediate') as url:
+                    result = self._mixed_traffic(url, users, options)
+                results.append(OrderedDict(
+                    [(key, profile[key]) for key in
+                     ('mode', 'worker_class', 'workers', 'threads')] +
+                    list(result.items())
+                ))
+        finally:
+            seeder._cleanup(users)
+
+        report = json.dumps(OrderedDict((
+            ('timestamp', time.time()),
+            ('python', platform.python_version()),
+            ('cpus', os.cpu_count()),
+            ('config', OrderedDict(
+                (key, options[key]) for key in
+                ('duration', 'slow_clients', 'slow_seconds', 'upload_size',
+                 'concurrency', 'users', 'recipes', 'seed')
+            )),
+            ('results', results),
+        )), indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        self.stdout.write(report)
+
+    def _mixed_traffic(self, base_url, users, options):
+        """Run slow uploads and fast list reads together for duration"""
+        list_url = base_url + reverse('recipes:recipe-list')
+        body = upload_body(options['upload_size'])
+        deadline = time.monotonic() + options['duration']
+        fast, slow, lock = [], [], threading.Lock()
+
+        def fast_client():
+            while time.monotonic() < deadline:
+                user = random.choice(users)
+                request = urllib.request.Request(list_url, headers={
+                    'Authorization': f'Token {user["token"]}'
+                })
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=60) as res:
+                        res.read()
+                        status = res.status
+                except urllib.error.HTTPError as exc:
+                    status = exc.code
+                except OSError:
+                    status = 599
+                with lock:
+                    fast.append((status, time.perf_counter() - start))
+
+        def slow_client():
+            while time.monotonic() < deadline:
+                user = random.choice(users)
+                path = reverse('recipes:recipe-upload-image',
+                               args=[random.choice(user['recipe_ids'])])
+                start = time.perf_counter()
+                try:
+                    status = slow_upload(base_url, path, user['token'], body,
+                                         options['slow_seconds'])
+                except (OSError, IndexError, ValueError):
+                    status = 599
+                with lock:
+                    slow.append((status, time.perf_counter() - start))
+
+        threads = [threading.Thread(target=fast_client)
+                   for _ in range(options['concurrency'])]
+        threads += [threading.Thread(target=slow_client)
+                    for _ in range(options['slow_clients'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for status, latency in fast)
+        return OrderedDict((
+            ('fast_requests', len(fast)),
+            ('fast_errors', sum(1 for status, _ in fast if status >= 400)),
+            ('fast_throughput_rps', round(len(fast) / wall, 2)),
+            ('fast_p50_ms', round(percentile(latencies, 50) or 0, 3)),
+            ('fast_p95_ms', round(percentile(latencies, 95) or 0, 3)),
+            ('fast_p99_ms', round(percentile(latencies, 99) or 0, 3)),
+            ('slow_uploads', len(slow)),
+            ('slow_errors', sum(1 for status, _ in slow if status >= 400)),
+            # Little's law: requests in flight on average
+            ('mean_in_flight', round(
+                sum(latency for _, latency in fast + slow) / wall, 2
+            )),
+        ))
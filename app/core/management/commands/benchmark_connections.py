@@ -0,0 +1,78 @@
+import json
+import os
+import platform
+import time
+from collections import OrderedDict
+
+from django.core.management.base import CommandError
+from django.db import connection
+
+from core.management.commands import benchmark_serving
+from core.serving import serving_profile
+
+# Environment of the servers for every way of reusing connections
+CONNECTION_PROFILES = OrderedDict((
+    ('per-request', {'DB_POOL_MODE': 'persistent', 'DB_CONN_MAX_AGE': '0'}),
+    ('persistent', {'DB_POOL_MODE': 'persistent',
+                    'DB_CONN_MAX_AGE': '600'}),
+    ('pool', {'DB_POOL_MODE': 'pool'}),
+))
+
+
+class Command(benchmark_serving.Command):
+    """Django command to compare ways of reusing database connections."""
+    help = ('Serve the project with a new connection per request, '
+            'persistent connections and an in-process pool in turn, load '
+            'test the tag list on each and print the results as JSON')
+    default_endpoints = ['tag-list']
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            choices=list(CONNECTION_PROFILES),
+                            help='Only run the named connection profiles')
+        parser.add_argument('--pool-size', type=int,
+                            help='Connections per pool, defaults to the '
+                                 'threads per worker')
+        parser.set_defaults(requests=1000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Connection reuse only applies to '
+                               'PostgreSQL')
+
+        mode = (options['modes'] or ['sync'])[0]
+        profile = serving_profile(mode)
+        profile['workers'] = options['workers'] or profile['workers']
+        profile['threads'] = options['threads'] or profile['threads']
+        pool_size = options['pool_size'] or profile['threads']
+
+        results = []
+        for name in options['profiles'] or CONNECTION_PROFILES:
+            environ = dict(CONNECTION_PROFILES[name],
+                           DB_POOL_MAX_SIZE=str(pool_size))
+            with self._server(profile, **environ) as base_url:
+                report = self._benchmark(base_url, options)
+            for result in report['results']:
+                result.pop('mode')
+                results.append(OrderedDict(
+                    [('connections', name)] + list(result.items())
+                ))
+
+        report = json.dumps(OrderedDict((
+            ('timestamp', time.time()),
+            ('python', platform.python_version()),
+            ('cpus', os.cpu_count()),
+            ('config', OrderedDict(
+                [(key, profile[key]) for key in
+                 ('mode', 'workers', 'threads')] +
+                [('pool_size', pool_size)] +
+                [(key, options[key]) for key in
+                 ('users', 'recipes', 'requests', 'concurrency', 'seed')]
+            )),
+            ('results', results),
+        )), indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        self.stdout.write(report)
@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag, Recipe
+from recipes.filters import match_all, match_any
+
+
+class Command(BaseCommand):
+    """Django command to compare recipe tag filter strategies."""
+    help = 'Seed a throwaway dataset and compare tag filter query plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--filter-tags', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user = self._seed(options)
+            tag_ids = set(
+                Tag.objects.filter(user=user).order_by('id').values_list(
+                    'id', flat=True
+                )[:options['filter_tags']]
+            )
+            recipes = Recipe.objects.filter(user=user)
+            through = Recipe.tags.through
+            cases = (
+                ('join (current)', recipes.filter(tags__id__in=tag_ids)),
+                ('exists any', match_any(recipes, through, 'tag', tag_ids)),
+                ('having all', match_all(recipes, through, 'tag', tag_ids)),
+            )
+            for name, queryset in cases:
+                self._report(name, queryset, options['repeat'])
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        """Create one user with random recipe tag fan-out"""
+        user = get_user_model().objects.create_user(
+            f'benchmark-{time.time()}@example.com', None
+        )
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(options['tags'])
+        )
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=10, price=5)
+            for i in range(options['recipes'])
+        )
+        tag_ids = list(Tag.objects.filter(user=user).values_list(
+            'id', flat=True
+        ))
+        recipe_ids = Recipe.objects.filter(user=user).values_list(
+            'id', flat=True
+        )
+        per_recipe = min(options['tags_per_recipe'], len(tag_ids))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in random.sample(tag_ids, per_recipe)
+        )
+        return user
+
+    def _report(self, name, queryset, repeat):
+        """Time a queryset and print its row counts and plan"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ids = list(queryset.values_list('id', flat=True))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(self.style.SUCCESS(f'== {name}'))
+        self.stdout.write(
+            f'rows={len(ids)} distinct={len(set(ids))} '
+            f'median_ms={statistics.median(timings):.2f} '
+            f'min_ms={min(timings):.2f}'
+        )
+        self.stdout.write(queryset.explain())
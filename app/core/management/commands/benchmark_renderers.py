@@ -0,0 +1,65 @@
+import statistics
+import time
+import tracemalloc
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """Django command to compare JSON renderers on large recipe lists."""
+    help = 'Compare render time and allocations of the JSON renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+',
+                            default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, FastJSONRenderer uses the stdlib'
+            ))
+        for rows in options['rows']:
+            data = self._recipes(rows)
+            self.stdout.write(self.style.SUCCESS(f'== {rows} recipes'))
+            for name, renderer in (('drf', JSONRenderer()),
+                                   ('fast', FastJSONRenderer())):
+                self._report(name, renderer, data, options['repeat'])
+
+    def _recipes(self, rows):
+        """Return a list shaped like a RecipeSerializer payload"""
+        return [OrderedDict((
+            ('id', index),
+            ('title', f'Recipe {index} with crème fraîche'),
+            ('ingredients', [index, index + 1, index + 2]),
+            ('tags', [index, index + 1]),
+            ('time_minutes', index % 90),
+            ('price', Decimal(index % 5000) / 100),
+            ('link', f'https://example.com/recipes/{index}'),
+            ('description', 'Mix everything together and bake. ' * 4),
+        )) for index in range(rows)]
+
+    def _report(self, name, renderer, data, repeat):
+        """Print the median render time and peak allocation"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            content = renderer.render(data)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        renderer.render(data)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'{name}: median_ms={statistics.median(timings):.2f} '
+            f'min_ms={min(timings):.2f} '
+            f'peak_kib={peak / 1024:.0f} bytes={len(content)}'
+        )
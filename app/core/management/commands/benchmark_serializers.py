@@ -0,0 +1,115 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.fastpath import FastRecipeSerializer
+from recipes.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare recipe list serializers."""
+    help = 'Seed throwaway recipes and compare list serializer throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+',
+                            default=[1000, 10000, 100000])
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'benchmark-{time.time()}@example.com', None
+            )
+            tag_ids = self._seed_attrs(Tag, user, options['tags'])
+            ingredient_ids = self._seed_attrs(Ingredient, user,
+                                              options['tags'])
+            seeded = 0
+            for rows in sorted(options['rows']):
+                self._seed_recipes(user, seeded, rows - seeded, tag_ids,
+                                   ingredient_ids, options)
+                seeded = rows
+                self._report(user, rows, options['repeat'])
+            transaction.set_rollback(True)
+
+    def _seed_attrs(self, model, user, count):
+        model.objects.bulk_create(
+            model(user=user, name=f'{model.__name__} {i}')
+            for i in range(count)
+        )
+        return list(model.objects.filter(user=user).values_list(
+            'id', flat=True
+        ))
+
+    def _seed_recipes(self, user, start, count, tag_ids, ingredient_ids,
+                      options):
+        """Add count recipes, each with random tags and ingredients"""
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=10,
+                   price='5.50', description='Mix everything. ' * 5)
+            for i in range(start, start + count)
+        )
+        recipe_ids = Recipe.objects.filter(user=user).order_by(
+            '-id'
+        ).values_list('id', flat=True)[:count]
+        per_recipe = min(options['tags_per_recipe'], len(tag_ids))
+        for field, ids in (('tag', tag_ids), ('ingredient', ingredient_ids)):
+            through = getattr(Recipe, f'{field}s').through
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, **{f'{field}_id': pk})
+                for recipe_id in recipe_ids
+                for pk in random.sample(ids, per_recipe)
+            )
+
+    def _report(self, user, rows, repeat):
+        """Time both serializers rendering every recipe of user"""
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        renderer = JSONRenderer()
+
+        def model_serializer():
+            recipes = queryset.defer('search_vector').prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id').order_by(
+                    'id'
+                )),
+                Prefetch('ingredients',
+                         queryset=Ingredient.objects.only('id').order_by(
+                             'id'
+                         )),
+            )
+            return renderer.render(RecipeSerializer(recipes, many=True).data)
+
+        def fast_serializer():
+            serializer = FastRecipeSerializer(RecipeSerializer)
+            return renderer.render(
+                serializer.serialize(serializer.rows(queryset))
+            )
+
+        results = {}
+        for name, func in (('model', model_serializer),
+                           ('fast', fast_serializer)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                content = func()
+                timings.append(time.perf_counter() - start)
+            results[name] = (statistics.median(timings), content)
+
+        model_time, model_content = results['model']
+        fast_time, fast_content = results['fast']
+        self.stdout.write(self.style.SUCCESS(f'== {rows} rows'))
+        self.stdout.write(
+            f'model_rows_per_s={rows / model_time:.0f} '
+            f'fast_rows_per_s={rows / fast_time:.0f} '
+            f'speedup={model_time / fast_time:.2f}x '
+            f'identical={model_content == fast_content}'
+        )
@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.serving import WORKER_CLASSES, serving_profile
+
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    """Return a local TCP port nothing is listening on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """Django command to compare sync and async worker throughput."""
+    help = ('Serve the project with gunicorn threaded workers and uvicorn '
+            'workers in turn, load test the recipe list on each and print '
+            'the results as JSON')
+    default_endpoints = ['recipe-list']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', dest='modes',
+                            choices=sorted(WORKER_CLASSES),
+                            help='Only run the named serving modes')
+        parser.add_argument('--workers', type=int,
+                            help='Worker processes, defaults to the '
+                                 'serving profile')
+        parser.add_argument('--threads', type=int,
+                            help='Threads per worker, defaults to the '
+                                 'serving profile')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Endpoints to load test, defaults to '
+                                 f'{", ".join(self.default_endpoints)}')
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Recipes per user')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--output', help='Write the report to a file')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and \
+                connection.is_in_memory_db():
+            raise CommandError('The servers cannot share an in-memory '
+                               'database, use PostgreSQL')
+
+        results = []
+        for mode in options['modes'] or ('sync', 'async'):
+            profile = serving_profile(mode)
+            profile['workers'] = options['workers'] or profile['workers']
+            profile['threads'] = options['threads'] or profile['threads']
+            with self._server(profile) as base_url:
+                report = self._benchmark(base_url, options)
+            for result in report['results']:
+                result.pop('mode')
+                results.append(OrderedDict(
+                    [(key, profile[key]) for key in
+                     ('mode', 'worker_class', 'workers', 'threads')] +
+                    list(result.items())
+                ))
+
+        report = json.dumps(OrderedDict((
+            ('timestamp', time.time()),
+            ('python', platform.python_version()),
+            ('cpus', os.cpu_count()),
+            ('config', OrderedDict(
+                (key, options[key]) for key in
+                ('users', 'recipes', 'requests', 'concurrency', 'seed')
+            )),
+            ('results', results),
+            ('speedup', self._speedup(results)),
+        )), indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        self.stdout.write(report)
+
+    def _benchmark(self, base_url, options):
+        """Run benchmark_api against a server and return its report"""
+        out = StringIO()
+        call_command(
+            'benchmark_api', stdout=out, mode='http', url=base_url,
+            endpoints=options['endpoints'] or self.default_endpoints,
+            **{key: options[key] for key in
+               ('users', 'recipes', 'requests', 'concurrency', 'seed')}
+        )
+        return json.loads(out.getvalue())
+
+    def _speedup(self, results):
+        """Return async over sync throughput of error free endpoints"""
+        throughput = {(result['mode'], result['endpoint']):
+                      result['throughput_rps'] for result in results
+                      if not result['errors']}
+        return OrderedDict(
+            (endpoint, round(rps / throughput[('sync', endpoint)], 2))
+            for (mode, endpoint), rps in throughput.items()
+            if mode == 'async' and throughput.get(('sync', endpoint))
+        )
+
+    @contextmanager
+    def _server(self, profile, **environ):
+        """Run gunicorn with a serving profile and yield its base URL"""
+        port = free_port()
+        env = dict(
+            os.environ,
+            **environ,
+            DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+            # Lets the servers find a test database
+            DB_NAME=connection.settings_dict['NAME'],
+            SERVING_MODE=profile['mode'],
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            WEB_CONCURRENCY=str(profile['workers']),
+            GUNICORN_THREADS=str(profile['threads']),
+            ASGI_THREADS=str(profile['threads']),
+            GUNICORN_LOG_LEVEL='warning',
+        )
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn',
+                 '-c', 'python:app.gunicorn_conf'],
+                cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=log
+            )
+            try:
+                self._wait_for_server(process, port, log)
+                yield f'http://127.0.0.1:{port}'
+            finally:
+                self._stop_server(process)
+
+    def _wait_for_server(self, process, port, log):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError('gunicorn exited:\n' +
+                                   log.read().decode('utf-8', 'replace'))
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f'gunicorn did not start within '
+                           f'{STARTUP_TIMEOUT}s')
+
+    def _stop_server(self, process):
+        """Stop gunicorn gracefully, killing it if it takes too long"""
+        if process.poll() is not None:
+            return
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(STARTUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
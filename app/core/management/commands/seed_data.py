@@ -0,0 +1,209 @@
+import random
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.search import backfill_search_vectors
+
+DISHES = ('soup', 'salad', 'curry', 'stew', 'pie', 'risotto', 'tacos',
+          'noodles', 'omelette', 'pancakes', 'burger', 'lasagne')
+WORDS = ('spicy', 'smoky', 'lemon', 'garlic', 'herb', 'sweet', 'roasted',
+         'creamy', 'tomato', 'mushroom', 'chicken', 'tofu', 'ginger',
+         'basil', 'chilli', 'honey', 'fennel', 'paprika')
+
+
+def copy_value(value):
+    """Encode a value for the COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t') \
+        .replace('\n', '\\n').replace('\r', '\\r')
+
+
+class CopyStream:
+    """Read only file object producing COPY text lines from row tuples"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.count = 0
+
+    def read(self, size=-1):
+        parts, length = [self._buffer], len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = '\t'.join(copy_value(value) for value in row) + '\n'
+            parts.append(line)
+            length += len(line)
+            self.count += 1
+        data = ''.join(parts)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+class Command(BaseCommand):
+    """Django command to generate a large dataset for performance testing."""
+    help = ('Generate users, tags, ingredients, recipes and their links '
+            'with COPY on PostgreSQL and bulk inserts elsewhere')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=40,
+                            help='Ingredients per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument('--password', default='password123',
+                            help='Password shared by every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk insert without COPY')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk inserts even on PostgreSQL')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        use_copy = connection.vendor == 'postgresql' and \
+            not options['no_copy']
+        write = self._copy if use_copy else self._bulk_create
+        models = (get_user_model(), Tag, Ingredient, Recipe)
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            if use_copy:
+                self._lock(models)
+            first = {model: (model.objects.aggregate(
+                last=Max('id')
+            )['last'] or 0) + 1 for model in models}
+
+            for model, columns, rows in self._tables(first, options):
+                table_start = time.perf_counter()
+                count = write(model, columns, rows, options['batch_size'])
+                self.stdout.write(
+                    f'{model._meta.db_table}: {count} rows in '
+                    f'{time.perf_counter() - table_start:.1f}s'
+                )
+
+            self._reset_sequences(models)
+            recipes = options['users'] * options['recipes']
+            if recipes:
+                backfill_search_vectors(first[Recipe],
+                                        first[Recipe] + recipes - 1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {options["users"]} users in '
+            f'{time.perf_counter() - start:.1f}s'
+        ))
+
+    def _tables(self, first, options):
+        """Yield (model, columns, rows) for every table, parents first"""
+        now = timezone.now()
+        users = options['users']
+        user_model = get_user_model()
+        # Hash once, every generated user shares the same password
+        password = make_password(options['password'])
+        user_ids = range(first[user_model], first[user_model] + users)
+
+        yield user_model, (
+            'id', 'password', 'is_superuser', 'email', 'name', 'is_active',
+            'is_staff'
+        ), (
+            (pk, password, False, f'user{pk}@example.com', f'User {pk}',
+             True, False) for pk in user_ids
+        )
+
+        per_user = {Tag: options['tags'], Ingredient: options['ingredients']}
+        for model, count in per_user.items():
+            yield model, ('id', 'name', 'user_id', 'updated_at'), (
+                (first[model] + index * count + offset,
+                 f'{random.choice(WORDS).title()} {offset}', user_id, now)
+                for index, user_id in enumerate(user_ids)
+                for offset in range(count)
+            )
+
+        recipes = options['recipes']
+        yield Recipe, (
+            'id', 'user_id', 'title', 'time_minutes', 'price', 'link',
+            'description', 'image', 'image_status', 'updated_at'
+        ), (
+            (first[Recipe] + index * recipes + offset, user_id,
+             f'{random.choice(WORDS).title()} {random.choice(DISHES)}',
+             random.randint(5, 180), f'{random.uniform(1, 99):.2f}', '',
+             ' '.join(random.sample(WORDS, 5)), None, '', now)
+            for index, user_id in enumerate(user_ids)
+            for offset in range(recipes)
+        )
+
+        for field, model, per_recipe in (
+                ('tags', Tag, options['tags_per_recipe']),
+                ('ingredients', Ingredient,
+                 options['ingredients_per_recipe'])):
+            through = getattr(Recipe, field).through
+            count = per_user[model]
+            yield through, ('recipe_id', f'{model._meta.model_name}_id'), (
+                (first[Recipe] + index * recipes + offset, related_id)
+                for index in range(users)
+                for offset in range(recipes)
+                for related_id in random.sample(
+                    range(first[model] + index * count,
+                          first[model] + (index + 1) * count),
+                    min(per_recipe, count)
+                )
+            )
+
+    def _copy(self, model, columns, rows, batch_size):
+        """Stream rows into a table with COPY FROM STDIN"""
+        opts = model._meta
+        column_list = ', '.join(opts.get_field(name).column
+                                for name in columns)
+        stream = CopyStream(rows)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY {opts.db_table} ({column_list}) FROM STDIN',
+                stream
+            )
+        return stream.count
+
+    def _bulk_create(self, model, columns, rows, batch_size):
+        """Insert rows with bulk_create, batch_size objects at a time"""
+        rows = iter(rows)
+        count = 0
+        while True:
+            batch = [model(**dict(zip(columns, row)))
+                     for row in islice(rows, batch_size)]
+            if not batch:
+                return count
+            model.objects.bulk_create(batch)
+            count += len(batch)
+
+    def _lock(self, models):
+        """Stop concurrent writers taking the ids about to be inserted"""
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(
+                    f'LOCK TABLE {model._meta.db_table} IN EXCLUSIVE MODE'
+                )
+
+    def _reset_sequences(self, models):
+        """Move id sequences past the explicitly inserted ids"""
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
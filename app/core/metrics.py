@@ -0,0 +1,143 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from rest_framework import serializers
+
+DURATION_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Recorded metrics of every view and the buckets they are counted in
+METRIC_BUCKETS = OrderedDict((
+    ('total_ms', DURATION_BUCKETS),
+    ('db_ms', DURATION_BUCKETS),
+    ('db_queries', COUNT_BUCKETS),
+    ('pool_wait_ms', DURATION_BUCKETS),
+    ('hash_ms', DURATION_BUCKETS),
+    ('serialize_ms', DURATION_BUCKETS),
+    ('render_ms', DURATION_BUCKETS),
+    ('response_bytes', SIZE_BUCKETS),
+))
+
+_local = threading.local()
+
+
+class Histogram:
+    """Cumulative bucket histogram of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self):
+        """Return the histogram as a JSON friendly dict"""
+        cumulative, buckets = 0, OrderedDict()
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return OrderedDict((
+            ('count', self.count),
+            ('sum', round(self.sum, 3)),
+            ('max', round(self.max, 3)),
+            ('buckets', buckets),
+        ))
+
+
+class MetricsRegistry:
+    """In-process histograms of request metrics, grouped by view"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(OrderedDict)
+
+    def record(self, view, values):
+        with self._lock:
+            histograms = self._views[view]
+            for name, value in values.items():
+                if name not in histograms:
+                    histograms[name] = Histogram(METRIC_BUCKETS[name])
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return OrderedDict(
+                (view, OrderedDict((name, histogram.snapshot())
+                                   for name, histogram in histograms.items()))
+                for view, histograms in sorted(self._views.items())
+            )
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Timings collected while a single request is handled"""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = defaultdict(float)
+        self._active = set()
+
+    def add(self, name, seconds):
+        self.timings[name] += seconds
+
+
+def start_request():
+    """Begin collecting metrics for the current thread's request"""
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def finish_request():
+    """Stop collecting metrics for the current thread's request"""
+    _local.metrics = None
+
+
+def current():
+    """Return the metrics of the request being handled, if any"""
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the block to the current request's metrics"""
+    metrics = current()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+    metrics._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+        metrics._active.discard(name)
+
+
+class TimedSerializerMixin:
+    """Record the time spent building a serializer's data"""
+
+    @property
+    def data(self):
+        with timer('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer recording the time spent building its data"""
@@ -0,0 +1,144 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from core import metrics
+from core.querydebug import inspect_queries
+from core.routers import pin_to_primary
+from core.serving import cache_is_shared
+
+
+class QueryTimer:
+    """Execute wrapper counting and timing every database query"""
+
+    def __init__(self, request_metrics):
+        self.metrics = request_metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.queries += 1
+            self.metrics.add('db', time.perf_counter() - start)
+
+
+def view_name(view_func, method):
+    """Return a readable `Class.action` name for a resolved view"""
+    cls = getattr(view_func, 'cls', None) or \
+        getattr(view_func, 'view_class', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    handler = actions.get(method.lower(), method.lower())
+    return f'{cls.__name__}.{handler}'
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count and time, serializer and render time and response
+    size of every request to a view, reporting them in a Server-Timing
+    header and in the in-process metrics registry.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(
+                        QueryTimer(request_metrics)
+                    ))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        total = time.perf_counter() - start
+
+        view = getattr(request, '_metrics_view', None)
+        if view is None:
+            return response
+
+        timings = request_metrics.timings
+        values = {
+            'total_ms': total * 1000,
+            'db_ms': timings['db'] * 1000,
+            'db_queries': request_metrics.queries,
+            'serialize_ms': timings['serialize'] * 1000,
+            'render_ms': timings['render'] * 1000,
+        }
+        # Only requests taking a connection from a pool wait for one
+        if 'pool' in timings:
+            values['pool_wait_ms'] = timings['pool'] * 1000
+        # Only requests checking or setting a password hash one
+        if 'hash' in timings:
+            values['hash_ms'] = timings['hash'] * 1000
+        if not response.streaming:
+            values['response_bytes'] = len(response.content)
+        metrics.registry.record(view, values)
+
+        server_timing = [
+            f'db;dur={values["db_ms"]:.2f};'
+            f'desc="{request_metrics.queries} queries"',
+            f'serialize;dur={values["serialize_ms"]:.2f}',
+            f'render;dur={values["render_ms"]:.2f}',
+            f'total;dur={values["total_ms"]:.2f}',
+        ]
+        if 'pool_wait_ms' in values:
+            server_timing.insert(
+                0, f'pool;dur={values["pool_wait_ms"]:.2f}'
+            )
+        if 'hash_ms' in values:
+            server_timing.insert(0, f'hash;dur={values["hash_ms"]:.2f}')
+        response['Server-Timing'] = ', '.join(server_timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_name(view_func, request.method)
+
+
+class QueryDebugMiddleware:
+    """Log the slow queries and likely N+1 patterns of every request"""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inspect_queries() as inspector:
+            response = self.get_response(request)
+        label = getattr(request, '_metrics_view', None) or request.path
+        inspector.report(label)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Pin a user's reads to the primary for a while after every write"""
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        if not cache_is_shared(settings.CACHES['default']['BACKEND'],
+                               settings.SERVER_PROCESSES):
+            raise ImproperlyConfigured(
+                'Replica routing pins users to the primary in the default '
+                'cache, which must be shared by the server processes. Set '
+                'CACHE_BACKEND to a shared cache such as memcached.'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and user is not None and \
+                user.is_authenticated:
+            pin_to_primary(user)
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 2.1.15 on 2026-10-17 05:41
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = 'core_recipe_search_vector_idx'
+
+
+def create_search_index(apps, schema_editor):
+    """Index and backfill search vectors where tsvector is supported"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {SEARCH_INDEX} ON core_recipe '
+        f'USING gin (search_vector)'
+    )
+    schema_editor.execute("""
+        UPDATE core_recipe SET search_vector =
+            setweight(to_tsvector('english', title), 'A') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT string_agg(name, ' ') FROM (
+                    SELECT t.name FROM core_tag t
+                    JOIN core_recipe_tags rt ON rt.tag_id = t.id
+                    WHERE rt.recipe_id = core_recipe.id
+                    UNION ALL
+                    SELECT i.name FROM core_ingredient i
+                    JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+                    WHERE ri.recipe_id = core_recipe.id
+                ) names
+            ), '')), 'B') ||
+            setweight(to_tsvector('english', description), 'C')
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX {SEARCH_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 
 
 def recipe_image_file_path(instance, filename):
@@ -14,12 +15,25 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def recipe_rendition_file_path(instance, filename):
+    """Generate file path for a new recipe image rendition"""
+    ext = filename.split('.')[-1]
+    filename = f'{uuid.uuid4()}.{ext}'
+
+    return os.path.join('uploads/recipe/renditions/', filename)
+
+
 class UserManager(BaseUserManager):
-    def create_user(self, email, password=None, **extra_fields):
-        """Creates and saves a new user"""
+    def build_user(self, email, encoded_password='', **extra_fields):
+        """Returns an unsaved user with an already hashed password"""
         if not email:
             raise ValueError('User must have an email address.')
-        user = self.model(email=self.normalize_email(email), **extra_fields)
+        return self.model(email=self.normalize_email(email),
+                          password=encoded_password, **extra_fields)
+
+    def create_user(self, email, password=None, **extra_fields):
+        """Creates and saves a new user"""
+        user = self.build_user(email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
 
@@ -53,6 +67,13 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', 'id'],
+                         name='core_tag_user_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -65,6 +86,13 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', 'id'],
+                         name='core_ingredient_user_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -72,6 +100,15 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """Recipe Object"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -84,6 +121,33 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to=recipe_image_file_path, null=True)
+    image_status = models.CharField(max_length=10, blank=True,
+                                    choices=IMAGE_STATUS_CHOICES)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'],
+                         name='core_recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageRendition(models.Model):
+    """Resized copy of a recipe image"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='renditions'
+    )
+    name = models.CharField(max_length=50)
+    format = models.CharField(max_length=10)
+    file = models.ImageField(upload_to=recipe_rendition_file_path)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.recipe} {self.name} ({self.format})'
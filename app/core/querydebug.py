@@ -0,0 +1,96 @@
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter, OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?|[\w.]+)\s*,?)+\)', re.I)
+_SPACE_RE = re.compile(r'\s+')
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def sql_shape(sql):
+    """Return sql with literals and IN lists collapsed, to group repeats"""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _IN_LIST_RE.sub('IN (...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def app_stack(limit=10):
+    """Return the innermost frames of the current stack in project code"""
+    root = os.path.abspath(str(settings.BASE_DIR))
+    frames = [frame for frame in traceback.extract_stack()
+              if frame.filename.startswith(root) and
+              'site-packages' not in frame.filename and
+              frame.filename != _THIS_FILE]
+    return traceback.format_list(frames[-limit:])
+
+
+class QueryInspector:
+    """
+    Execute wrapper grouping queries by SQL shape and keeping the stack
+    of every query slower than slow_ms.
+    """
+
+    def __init__(self, slow_ms=None):
+        if slow_ms is None:
+            slow_ms = settings.SLOW_QUERY_MS
+        self.slow_ms = slow_ms
+        self.shapes = Counter()
+        self.examples = OrderedDict()
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            shape = sql_shape(sql)
+            self.shapes[shape] += 1
+            self.examples.setdefault(shape, sql)
+            if duration >= self.slow_ms:
+                self.slow.append((duration, sql, app_stack()))
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold):
+        """Return (count, shape) of shapes run at least threshold times"""
+        return [(count, shape) for shape, count in self.shapes.most_common()
+                if count >= threshold]
+
+    def report(self, label, threshold=None):
+        """Log the slow queries and likely N+1 patterns seen so far"""
+        if threshold is None:
+            threshold = settings.NPLUSONE_THRESHOLD
+        for duration, sql, stack in self.slow:
+            logger.warning('Slow query in %s (%.1f ms): %s\n%s',
+                           label, duration, sql, ''.join(stack))
+        for count, shape in self.repeated(threshold):
+            logger.warning('Possible N+1 in %s: %d x %s',
+                           label, count, shape)
+
+
+@contextmanager
+def inspect_queries(slow_ms=None, using=None):
+    """Inspect the queries run on one or every connection in the block"""
+    inspector = QueryInspector(slow_ms)
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(
+                connections[alias].execute_wrapper(inspector)
+            )
+        yield inspector
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.metrics import timer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class DecimalJSONEncoder(JSONEncoder):
+    """JSON encoder writing Decimals the way DecimalField represents them"""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            if api_settings.COERCE_DECIMAL_TO_STRING:
+                return str(obj)
+            return float(obj)
+        return super().default(obj)
+
+
+encode_default = DecimalJSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer using orjson when it is installed.
+
+    Indented or ASCII only output, and installs without orjson, use the
+    stdlib encoder. Both encoders write Decimals as DecimalField would and
+    otherwise match JSONRenderer byte for byte.
+    """
+    encoder_class = DecimalJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timer('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if orjson is None or indent or self.ensure_ascii or \
+                not self.compact:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        if data is None:
+            return bytes()
+
+        ret = orjson.dumps(
+            data,
+            default=encode_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        # Escape the line separators JavaScript does not allow in strings
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
@@ -0,0 +1,89 @@
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_local = threading.local()
+
+
+def pin_key(user_id):
+    """Return the cache key pinning a user's reads to the primary"""
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """Read a user's data from the primary until replicas catch up"""
+    cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    """Return whether a user wrote recently enough to read the primary"""
+    return user.is_authenticated and bool(cache.get(pin_key(user.pk)))
+
+
+def current_replica():
+    """Return the replica reads go to in this thread, None for primary"""
+    return getattr(_local, 'replica', None)
+
+
+def use_replica(alias):
+    """Send this thread's reads to a replica, or back to the primary"""
+    _local.replica = alias
+
+
+def choose_replica():
+    """Return a random configured replica, None when there are none"""
+    replicas = settings.REPLICA_DATABASES
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """
+    Send reads to the replica chosen for the current request and
+    everything else to the primary.
+
+    Reads inside a transaction stay on the primary so they see the
+    transaction's own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica()
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Serve a view's safe requests from a read replica, unless the user
+    has written in the last REPLICA_PIN_SECONDS or the action is in
+    primary_actions.
+    """
+    primary_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            use_replica(None)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication reads the primary, so new tokens always work
+        super().initial(request, *args, **kwargs)
+        if settings.REPLICA_DATABASES and self.reads_from_replica(request):
+            use_replica(choose_replica())
+
+    def reads_from_replica(self, request):
+        return request.method in SAFE_METHODS and \
+            self.action not in self.primary_actions and \
+            not is_pinned(request.user)
@@ -0,0 +1,113 @@
+import os
+
+# Imported by the gunicorn config before Django is set up, so everything
+# here is configured from the environment rather than from settings.
+SYNC_WORKER = 'gthread'
+ASYNC_WORKER = 'uvicorn.workers.UvicornWorker'
+WORKER_CLASSES = {'sync': SYNC_WORKER, 'async': ASYNC_WORKER}
+APPLICATIONS = {'sync': 'app.wsgi:application',
+                'async': 'app.asgi:application'}
+
+# PostgreSQL's default max_connections, less a few for migrations,
+# management commands and psql sessions
+DB_MAX_CONNECTIONS = 100
+DB_RESERVED_CONNECTIONS = 5
+# More threads than this only queue on the GIL
+MAX_THREADS = 8
+# Defaults of the task queue workers and, under ASGI, the upload lane
+# threads each worker runs next to its request threads
+TASK_QUEUE_WORKERS = 2
+UPLOAD_THREADS = 2
+# Cache backends keeping their entries in each process's own memory
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def env_int(name, default):
+    """Return an integer environment variable, default when unset"""
+    value = os.environ.get(name, '')
+    return int(value) if value.strip() else default
+
+
+def env_flag(name, default=False):
+    """Return a boolean environment variable"""
+    value = os.environ.get(name, '')
+    if not value.strip():
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def cpu_count():
+    """Return the number of CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def db_connections():
+    """Return the database connections the web servers may hold"""
+    return max(1, env_int('DB_MAX_CONNECTIONS', DB_MAX_CONNECTIONS) -
+               env_int('DB_RESERVED_CONNECTIONS', DB_RESERVED_CONNECTIONS))
+
+
+def workers_for(cpus, mode='sync', connections=None):
+    """
+    Return the worker processes to run on cpus CPUs: (2 x cpus) + 1
+    threaded workers, which spend much of their time waiting on the
+    database, or one event loop per CPU, never more than connections.
+    """
+    workers = max(1, cpus) if mode == 'async' else 2 * max(1, cpus) + 1
+    if connections is not None:
+        workers = min(workers, connections)
+    return max(1, workers)
+
+
+def background_threads(mode='sync'):
+    """
+    Return the threads besides the request threads holding database
+    connections in every worker: the task queue's and the upload lane's.
+    """
+    threads = 0
+    if os.environ.get('TASK_QUEUE_BACKEND', 'thread') == 'thread':
+        threads += env_int('TASK_QUEUE_WORKERS', TASK_QUEUE_WORKERS)
+    if mode == 'async':
+        threads += env_int('ASGI_UPLOAD_THREADS', UPLOAD_THREADS)
+    return threads
+
+
+def threads_for(workers, connections, limit=MAX_THREADS, background=0):
+    """
+    Return the request threads per worker so every thread of every
+    worker, background threads included, can hold its own database
+    connection without exhausting the server.
+    """
+    per_worker = connections // max(1, workers) - background
+    return max(1, min(limit, per_worker))
+
+
+def cache_is_shared(backend, processes):
+    """Return whether every server process sees the same cache entries"""
+    return processes <= 1 or backend not in PROCESS_LOCAL_CACHES
+
+
+def serving_profile(mode=None):
+    """Return the worker class, application, workers and threads to run"""
+    mode = mode or os.environ.get('SERVING_MODE', 'sync')
+    if mode not in WORKER_CLASSES:
+        raise ValueError(
+            f'SERVING_MODE must be one of {sorted(WORKER_CLASSES)}, '
+            f'not {mode!r}'
+        )
+    connections = db_connections()
+    workers = env_int('WEB_CONCURRENCY',
+                      workers_for(cpu_count(), mode, connections))
+    threads = env_int('GUNICORN_THREADS', threads_for(
+        workers, connections, background=background_threads(mode)
+    ))
+    return {
+        'mode': mode,
+        'worker_class': WORKER_CLASSES[mode],
+        'wsgi_app': APPLICATIONS[mode],
+        'workers': workers,
+        'threads': threads,
+    }
@@ -0,0 +1,49 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    """Return the process wide worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASK_QUEUE_WORKERS,
+            thread_name_prefix='tasks'
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    """Run a task in a worker, releasing its database connections after"""
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Task %s failed', func.__name__)
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Run func in the background once the current transaction commits.
+
+    The `thread` backend runs tasks on an in-process worker pool and the
+    `immediate` backend runs them inline, which keeps tests deterministic
+    without a broker.
+    """
+    backend = settings.TASK_QUEUE_BACKEND
+    if backend == 'immediate':
+        func(*args, **kwargs)
+    elif backend == 'thread':
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run, func, args, kwargs)
+        )
+    else:
+        raise ValueError(f'Unknown task queue backend: {backend}')
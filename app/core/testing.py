@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from core.querydebug import inspect_queries
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner hashing passwords with TEST_PASSWORD_HASHERS"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._hashers = override_settings(
+            PASSWORD_HASHERS=settings.TEST_PASSWORD_HASHERS
+        )
+        self._hashers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._hashers.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class QueryCountMixin:
+    """TestCase mixin asserting query counts do not grow with the data"""
+    nplusone_threshold = 3
+
+    def assertQueryCountConstant(self, func, grow, sizes=(2, 12)):
+        """
+        Call grow(n) to add n rows, then func, for every size in sizes,
+        failing if func runs more queries once there is more data.
+
+        Returns the result of the last call to func.
+        """
+        counts, added, result = [], 0, None
+        for size in sizes:
+            grow(size - added)
+            added = size
+            with inspect_queries(slow_ms=float('inf')) as inspector:
+                result = func()
+            counts.append(inspector.count)
+
+        if len(set(counts)) > 1:
+            repeated = '\n'.join(
+                f'  {count} x {shape}' for count, shape in
+                inspector.repeated(self.nplusone_threshold)
+            ) or '  (no repeated query shapes)'
+            self.fail(
+                f'Query count grew with the data: '
+                f'{dict(zip(sizes, counts))}\n'
+                f'Repeated queries at size {sizes[-1]}:\n{repeated}'
+            )
+        return result
@@ -0,0 +1,219 @@
+import asyncio
+import io
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.asgi import AsyncViewsApplication, async_lane, receive_body
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+BOUNDARY = 'recipe-boundary'
+
+
+class InlineExecutor:
+    """Executor running calls on the calling thread, inside the test"""
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def http_scope(method, path, headers=()):
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'http_version': '1.1',
+            'headers': [(b'host', b'testserver')] + list(headers)}
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def multipart_image():
+    """Return a multipart body uploading a small JPEG as image"""
+    image = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(image, format='JPEG')
+    return (
+        f'--{BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="image"; '
+        f'filename="image.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image.getvalue() + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+class AsyncLaneTests(SimpleTestCase):
+
+    def test_async_actions_resolved(self):
+        """Test the recipe list, detail and image upload are async"""
+        detail = reverse('recipes:recipe-detail', args=[1])
+        upload = reverse('recipes:recipe-upload-image', args=[1])
+
+        self.assertEqual(async_lane(http_scope('GET', RECIPES_URL)), 'orm')
+        self.assertEqual(async_lane(http_scope('GET', detail)), 'orm')
+        self.assertEqual(async_lane(http_scope('POST', upload)), 'upload')
+
+    def test_other_requests_not_async(self):
+        """Test every other request goes through the WSGI adapter"""
+        self.assertIsNone(async_lane(http_scope('POST', RECIPES_URL)))
+        self.assertIsNone(async_lane(http_scope('GET', TAGS_URL)))
+        self.assertIsNone(async_lane(http_scope('GET', '/missing/')))
+        self.assertIsNone(async_lane({'type': 'lifespan'}))
+
+    def test_receive_body_spills_to_executor(self):
+        """Test large bodies are written to disk off the event loop"""
+        chunks = [b'a' * 10, b'b' * 10, b'c' * 10]
+        messages = [{'type': 'http.request', 'body': chunk,
+                     'more_body': index < 2}
+                    for index, chunk in enumerate(chunks)]
+        writes = []
+
+        class RecordingExecutor(InlineExecutor):
+            def submit(self, func, *args):
+                writes.append(args)
+                return super().submit(func, *args)
+
+        async def receive():
+            return messages.pop(0)
+
+        body = run(receive_body(receive, RecordingExecutor(), 15))
+
+        self.assertEqual(body.read(), b''.join(chunks))
+        self.assertEqual(writes, [(b'b' * 10,), (b'c' * 10,)])
+
+    def test_receive_body_disconnect(self):
+        """Test nothing is handled when the client goes away"""
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        self.assertIsNone(run(receive_body(receive, InlineExecutor(), 10)))
+
+
+@override_settings(TASK_QUEUE_BACKEND='immediate')
+class AsyncViewsTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com', 'testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=5
+        )
+        self.application = AsyncViewsApplication(
+            get_wsgi_application(), max_threads=1, upload_threads=1
+        )
+        self.application.lanes = {'orm': InlineExecutor(),
+                                  'upload': InlineExecutor()}
+
+    def test_list(self):
+        """Test the recipe list is served natively"""
+        sent = self.send('GET', RECIPES_URL)
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'server-timing', dict(sent[0]['headers']))
+        data = json.loads(sent[1]['body'])
+        self.assertEqual([recipe['title'] for recipe in data['results']],
+                         ['Soup'])
+
+    def test_retrieve(self):
+        """Test a recipe is served natively"""
+        sent = self.send(
+            'GET', reverse('recipes:recipe-detail', args=[self.recipe.id])
+        )
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(json.loads(sent[1]['body'])['title'], 'Soup')
+
+    def test_unauthenticated(self):
+        """Test authentication still applies to native requests"""
+        sent = self.send('GET', RECIPES_URL, token=False)
+
+        self.assertEqual(sent[0]['status'], 401)
+
+    def test_upload_image_streamed(self):
+        """Test an image uploaded in chunks is saved"""
+        media_root = mkdtemp()
+        self.addCleanup(rmtree, media_root)
+        body = multipart_image()
+
+        with override_settings(MEDIA_ROOT=media_root):
+            sent = self.send(
+                'POST',
+                reverse('recipes:recipe-upload-image',
+                        args=[self.recipe.id]),
+                body=body, chunk=64, headers=[
+                    (b'content-type', f'multipart/form-data; '
+                                      f'boundary={BOUNDARY}'.encode()),
+                    (b'content-length', str(len(body)).encode()),
+                ]
+            )
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(sent[0]['status'], 202)
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        self.assertTrue(os.path.exists(
+            os.path.join(media_root, self.recipe.image.name)
+        ))
+
+    def send(self, method, path, body=b'', chunk=None, headers=(),
+             token=True):
+        """Send a request to the application and return its messages"""
+        chunk = chunk or len(body) or 1
+        messages = [{'type': 'http.request',
+                     'body': body[start:start + chunk],
+                     'more_body': start + chunk < len(body)}
+                    for start in range(0, len(body) or 1, chunk)]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        headers = list(headers)
+        if token:
+            headers.append(
+                (b'authorization', f'Token {self.token.key}'.encode())
+            )
+        run(self.application(http_scope(method, path, headers),
+                             receive, send))
+        return sent
+
+
+class AsyncViewsThreadTests(SimpleTestCase):
+
+    def test_fallback_shares_orm_lane(self):
+        """Test the WSGI adapter and native reads share a thread pool"""
+        application = AsyncViewsApplication(
+            get_wsgi_application(), max_threads=2, upload_threads=1
+        )
+        self.addCleanup(application.shutdown)
+
+        self.assertIs(application.lanes['orm'], application.executor)
+        self.assertIsInstance(application.lanes['upload'],
+                              ThreadPoolExecutor)
+        self.assertIsNot(application.lanes['upload'], application.executor)
@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import CachedTokenAuthentication, CachedUser, \
+    TokenCache, token_cache
+
+ME_URL = reverse('users:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating requests through the token cache"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123',
+            name='Ali'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_request_skips_token_query(self):
+        """Test a cached token authenticates without querying"""
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_shared_cache_fills_local_cache(self):
+        """Test a token cached by another process skips the query"""
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token is no longer accepted"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user can no longer authenticate"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_refreshes_cached_user(self):
+        """Test updating the user through the API invalidates the cache"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Ali S', 'password': 'newpass1'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Ali S')
+
+    def test_requests_get_their_own_user(self):
+        """Test cached users are never shared between requests"""
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        second, _ = authentication.authenticate_credentials(self.token.key)
+        third, _ = authentication.authenticate_credentials(self.token.key)
+
+        second.name = 'Changed'
+
+        self.assertIsNot(second, third)
+        self.assertEqual(third.name, 'Ali')
+
+    def test_password_not_cached(self):
+        """Test password hashes are kept out of the token cache"""
+        self.client.get(ME_URL)
+        cached = cache.get(TokenCache.shared_key(self.token.key))
+
+        self.assertIsInstance(cached, CachedUser)
+        self.assertNotIn('password', dict(cached.fields))
+        self.assertNotIn(self.user.password, str(cached))
+
+        user = cached.build()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('testpass123'))
+
+    def test_cached_user_save_keeps_password(self):
+        """Test saving a cached user does not overwrite its password"""
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        user, _ = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+
+        user.name = 'Ali S'
+        user.save()
+        self.user.refresh_from_db()
+
+        self.assertEqual(self.user.name, 'Ali S')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+
+class TokenCacheTests(TestCase):
+    """Test the bounded token cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest token is evicted once the cache is full"""
+        token_cache = TokenCache(max_size=2, shared_alias=None)
+        token_cache.set('one', 1)
+        token_cache.set('two', 2)
+        token_cache.get('one')
+        token_cache.set('three', 3)
+
+        self.assertEqual(token_cache.get('one'), 1)
+        self.assertIsNone(token_cache.get('two'))
+        self.assertEqual(token_cache.get('three'), 3)
+
+    def test_expired_entries_ignored(self):
+        """Test local entries expire after the TTL"""
+        token_cache = TokenCache(local_ttl=0, shared_alias=None)
+        token_cache.set('one', 1)
+
+        self.assertIsNone(token_cache.get('one'))
@@ -1,8 +1,26 @@
+import json
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.db.models import F
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import LiveServerTestCase, TestCase
+
+from core.management.commands.seed_data import CopyStream
+from core.models import Tag, Ingredient, Recipe
+
+BENCHMARK_OPTIONS = {'users': 2, 'recipes': 3, 'tags': 3, 'fan_out': 2,
+                     'requests': 3}
+
+
+def run_benchmark_api(**options):
+    """Run the API benchmark and return its parsed JSON report"""
+    out = StringIO()
+    call_command('benchmark_api', stdout=out,
+                 **dict(BENCHMARK_OPTIONS, **options))
+    return json.loads(out.getvalue())
 
 
 class CommandTests(TestCase):
@@ -21,3 +39,113 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_benchmark_filters(self):
+        """Test the filter benchmark reports every strategy and rolls back"""
+        out = StringIO()
+        call_command('benchmark_filters', recipes=20, tags=5,
+                     tags_per_recipe=3, repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('join (current)', output)
+        self.assertIn('exists any', output)
+        self.assertIn('having all', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_renderers(self):
+        """Test the renderer benchmark reports both renderers"""
+        out = StringIO()
+        call_command('benchmark_renderers', rows=[10], repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('== 10 recipes', output)
+        self.assertIn('drf: median_ms=', output)
+        self.assertIn('fast: median_ms=', output)
+
+    def test_benchmark_serializers(self):
+        """Test the serializer benchmark reports identical output"""
+        out = StringIO()
+        call_command('benchmark_serializers', rows=[5, 10], tags=4,
+                     tags_per_recipe=2, repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('== 5 rows', output)
+        self.assertIn('== 10 rows', output)
+        self.assertNotIn('identical=False', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_api_inprocess(self):
+        """Test the API benchmark reports every endpoint and cleans up"""
+        report = run_benchmark_api(mode='inprocess')
+
+        results = {result['endpoint']: result for result in report['results']}
+        self.assertIn('recipe-list', results)
+        self.assertIn('user-token', results)
+        for result in results.values():
+            self.assertEqual(result['mode'], 'inprocess')
+            self.assertEqual(result['requests'], 3)
+            self.assertEqual(result['errors'], 0)
+            self.assertIsNotNone(result['queries_mean'])
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchmarkApiHttpTests(LiveServerTestCase):
+    """Test load testing the API over HTTP"""
+
+    def test_benchmark_api_http(self):
+        """Test the API benchmark drives a running server over HTTP"""
+        report = run_benchmark_api(mode='http', url=self.live_server_url,
+                                   endpoint=['recipe-list', 'user-me'],
+                                   concurrency=1)
+
+        self.assertEqual([result['endpoint'] for result in report['results']],
+                         ['recipe-list', 'user-me'])
+        for result in report['results']:
+            self.assertEqual(result['mode'], 'http')
+            self.assertEqual(result['errors'], 0)
+            self.assertIsNotNone(result['queries_max'])
+
+
+class SeedDataTests(TestCase):
+    """Test the bulk data seeding command"""
+
+    def test_copy_stream(self):
+        """Test rows are encoded in the COPY text format across reads"""
+        stream = CopyStream([(1, 'a\tb', None, True),
+                             (2, 'c\\d\ne', '', False)])
+
+        data = stream.read(5) + stream.read(5) + stream.read()
+
+        self.assertEqual(data, '1\ta\\tb\t\\N\tt\n2\tc\\\\d\\ne\t\tf\n')
+        self.assertEqual(stream.count, 2)
+        self.assertEqual(stream.read(), '')
+
+    def test_seed_data(self):
+        """Test seeding creates every row and link with usable passwords"""
+        call_command('seed_data', users=3, recipes=4, tags=5,
+                     ingredients=6, tags_per_recipe=2,
+                     ingredients_per_recipe=3, password='secret123',
+                     batch_size=7, stdout=StringIO())
+
+        users = get_user_model().objects.all()
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Ingredient.objects.count(), 18)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Recipe.tags.through.objects.count(), 24)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 36)
+        self.assertTrue(users[0].check_password('secret123'))
+        self.assertEqual(len({user.password for user in users}), 1)
+        self.assertFalse(Recipe.tags.through.objects.exclude(
+            tag__user=F('recipe__user')
+        ).exists())
+
+    def test_seed_data_appends(self):
+        """Test seeding twice adds rows after the existing ids"""
+        call_command('seed_data', users=1, recipes=1, stdout=StringIO())
+        call_command('seed_data', users=1, recipes=1, stdout=StringIO())
+
+        self.assertEqual(get_user_model().objects.count(), 2)
+        Tag.objects.create(user=get_user_model().objects.first(),
+                           name='After seeding')
@@ -0,0 +1,246 @@
+import threading
+import time
+from unittest.mock import patch
+
+import psycopg2
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from core import metrics
+from core.db.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params=None):
+        if not self.connection.usable:
+            raise psycopg2.OperationalError('server closed the connection')
+        self.connection.in_transaction = not self.connection.autocommit
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the backend and pool"""
+    isolation_level = None
+
+    def __init__(self, *args, **kwargs):
+        self.usable = True
+        self.closed = 0
+        self.autocommit = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def set_client_encoding(self, encoding):
+        pass
+
+    def get_parameter_status(self, name):
+        return 'UTC'
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_idle_connections_reused(self):
+        """Test released connections are handed out again"""
+        pool = ConnectionPool(FakeConnection, max_size=2)
+        first, waited = pool.acquire()
+        pool.release(first)
+        second, waited = pool.acquire()
+
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_full_pool_times_out(self):
+        """Test acquiring from a full pool fails after the timeout"""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.05)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting thread gets the next released connection"""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        held, waited = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, (held,))
+        timer.start()
+
+        connection, waited = pool.acquire()
+        timer.join()
+
+        self.assertIs(connection, held)
+        self.assertGreater(waited, 0.02)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_discarded_connection_closed(self):
+        """Test discarded connections are closed and free their slot"""
+        pool = ConnectionPool(FakeConnection, max_size=1)
+        connection, waited = pool.acquire()
+        pool.release(connection, discard=True)
+
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.acquire()[0], connection)
+
+    def test_idle_and_old_connections_closed(self):
+        """Test connections past max_idle or max_lifetime are closed"""
+        pool = ConnectionPool(FakeConnection, max_idle=60, max_lifetime=600)
+        idle, waited = pool.acquire()
+        old, waited = pool.acquire()
+        pool.release(idle)
+
+        later = time.monotonic() + 120
+        with patch('core.db.pool.time.monotonic', return_value=later):
+            self.assertIsNot(pool.acquire()[0], idle)
+        with patch('core.db.pool.time.monotonic',
+                   return_value=later + 600):
+            pool.release(old)
+
+        self.assertTrue(idle.closed)
+        self.assertTrue(old.closed)
+
+    def test_unusable_connection_replaced(self):
+        """Test connections failing the check are replaced"""
+        pool = ConnectionPool(FakeConnection,
+                              check=lambda connection: connection.usable)
+        broken, waited = pool.acquire()
+        broken.usable = False
+        pool.release(broken)
+
+        connection, waited = pool.acquire()
+
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        """Test a failed connection attempt does not use up the pool"""
+        attempts = [psycopg2.OperationalError('refused'), FakeConnection()]
+
+        def connect():
+            attempt = attempts.pop(0)
+            if isinstance(attempt, Exception):
+                raise attempt
+            return attempt
+
+        pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.acquire()
+
+        self.assertIsInstance(pool.acquire()[0], FakeConnection)
+
+
+@patch('psycopg2.connect', FakeConnection)
+class DatabaseWrapperTests(SimpleTestCase):
+
+    def wrapper(self, **settings):
+        settings_dict = dict(connection.settings_dict, ENGINE='core.db',
+                             NAME='app', **settings)
+        return DatabaseWrapper(settings_dict, alias=self.id())
+
+    def test_pooled_connections_shared(self):
+        """Test closing a pooled connection hands it to the next user"""
+        first = self.wrapper(POOL={'MODE': 'pool'})
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+
+        second = self.wrapper(POOL={'MODE': 'pool'})
+        second.ensure_connection()
+
+        self.assertIs(second.connection, raw)
+        self.assertFalse(raw.closed)
+
+    def test_pooled_connection_rolled_back(self):
+        """Test connections go back to the pool outside a transaction"""
+        wrapper = self.wrapper(POOL={'MODE': 'pool'})
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        raw.in_transaction = True
+        wrapper.close()
+
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertFalse(raw.closed)
+
+    def test_pool_wait_recorded(self):
+        """Test the time spent waiting for the pool is recorded"""
+        wrapper = self.wrapper(POOL={'MODE': 'pool'})
+        request_metrics = metrics.start_request()
+        try:
+            wrapper.ensure_connection()
+        finally:
+            metrics.finish_request()
+            wrapper.close()
+
+        self.assertIn('pool', request_metrics.timings)
+
+    def test_pool_timeout_is_operational_error(self):
+        """Test an exhausted pool raises a database error"""
+        options = {'MODE': 'pool', 'MAX_SIZE': 1, 'TIMEOUT': 0.01}
+        holder = self.wrapper(POOL=options)
+        holder.ensure_connection()
+
+        with self.assertRaises(OperationalError):
+            self.wrapper(POOL=options).ensure_connection()
+        holder.close()
+
+    def test_persistent_connection_health_checked(self):
+        """Test a dead persistent connection is replaced before use"""
+        wrapper = self.wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        dead = wrapper.connection
+        dead.usable = False
+
+        wrapper.close_if_unusable_or_obsolete()
+        wrapper.ensure_connection()
+
+        self.assertTrue(dead.closed)
+        self.assertIsNot(wrapper.connection, dead)
+        wrapper.close()
+
+    def test_health_checked_once_per_request(self):
+        """Test connections are only checked before their first query"""
+        wrapper = self.wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(wrapper, 'is_usable',
+                          return_value=True) as is_usable:
+            wrapper.ensure_connection()
+            wrapper.ensure_connection()
+
+        self.assertEqual(is_usable.call_count, 1)
+        self.assertIs(wrapper.connection, raw)
+        wrapper.close()
+
+    def test_unknown_pool_mode(self):
+        """Test an unknown pool mode is a configuration error"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(POOL={'MODE': 'pgpool'})
@@ -0,0 +1,92 @@
+import os
+
+from django.contrib.auth.hashers import MD5PasswordHasher, check_password, \
+    make_password
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+PBKDF2 = 'core.hashers.PBKDF2PasswordHasher'
+ARGON2 = 'core.hashers.Argon2PasswordHasher'
+
+
+class PidHasher(hashers.OffloadedHasherMixin, MD5PasswordHasher):
+    """MD5 hasher encoding the id of the process it ran in as the salt"""
+    algorithm = 'pid_md5'
+
+    def encode_inline(self, password, salt):
+        return super().encode_inline(password, str(os.getpid()))
+
+
+class HasherTests(SimpleTestCase):
+
+    def test_test_runner_hashes_fast(self):
+        """Test the test suite hashes with the fast test hasher"""
+        self.assertTrue(make_password('testpass').startswith('md5$'))
+
+    @override_settings(PASSWORD_HASHERS=[PBKDF2],
+                       PASSWORD_HASHING_PROCESSES=0)
+    def test_inline(self):
+        """Test passwords are hashed in the calling process by default"""
+        encoded = make_password('testpass')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertTrue(check_password('testpass', encoded))
+        self.assertFalse(check_password('wrongpass', encoded))
+        self.assertEqual(
+            PidHasher().encode('testpass', 'salt').split('$')[1],
+            str(os.getpid())
+        )
+
+    @override_settings(PASSWORD_HASHERS=[ARGON2, PBKDF2])
+    def test_argon2_parameters(self):
+        """Test argon2 hashes are at least as costly as OWASP advises"""
+        encoded = make_password('testpass')
+        params = dict(
+            param.split('=') for param in encoded.split('$')[3].split(',')
+        )
+
+        self.assertTrue(encoded.startswith('argon2$'))
+        self.assertGreaterEqual(int(params['m']), 19456)
+        self.assertGreaterEqual(int(params['t']), 2)
+        self.assertGreaterEqual(int(params['p']), 1)
+        self.assertTrue(check_password('testpass', encoded))
+
+    def test_legacy_hashes_verify(self):
+        """Test passwords hashed with Django's former defaults still verify"""
+        encoded = make_password('testpass', hasher='pbkdf2_sha1')
+
+        self.assertTrue(check_password('testpass', encoded))
+        self.assertFalse(check_password('wrongpass', encoded))
+
+    @override_settings(PASSWORD_HASHERS=[PBKDF2],
+                       PASSWORD_HASHING_PROCESSES=1)
+    def test_process_pool(self):
+        """Test passwords are hashed in another process when enabled"""
+        self.addCleanup(hashers.shutdown)
+
+        encoded = make_password('testpass')
+
+        self.assertTrue(check_password('testpass', encoded))
+        self.assertFalse(check_password('wrongpass', encoded))
+        self.assertNotEqual(
+            PidHasher().encode('testpass', 'salt').split('$')[1],
+            str(os.getpid())
+        )
+
+
+class HashTimingTests(TestCase):
+
+    @override_settings(PASSWORD_HASHERS=[PBKDF2])
+    def test_server_timing(self):
+        """Test time spent hashing passwords is reported"""
+        res = APIClient().post(reverse('users:create'), {
+            'email': 'ali@test.com', 'password': 'testpass', 'name': 'Ali'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('hash;dur=', res['Server-Timing'])
@@ -0,0 +1,61 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.filters import assigned_to_recipe, match_all, match_any
+
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (core_\w+)'),
+    'sqlite': re.compile(r'SCAN (?:TABLE )?(core_\w+)(?!.*USING)'),
+}
+
+
+class IndexPlanTests(TestCase):
+    """Test that the per user hot queries are planned with indexes"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertNoSequentialScan(self, queryset):
+        """Fail if the plan of queryset reads a core table sequentially"""
+        pattern = SEQUENTIAL_SCAN.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'No plan check for {connection.vendor}')
+        plan = queryset.explain()
+        self.assertIsNone(pattern.search(plan), plan)
+
+    def test_attr_list_uses_index(self):
+        """Test listing tags and ingredients uses the user name index"""
+        for model in (Tag, Ingredient):
+            queryset = model.objects.filter(user=self.user)
+            self.assertNoSequentialScan(queryset.order_by('-name', 'id'))
+            self.assertNoSequentialScan(
+                assigned_to_recipe(queryset).order_by('-name', 'id')
+            )
+
+    def test_recipe_list_uses_index(self):
+        """Test listing recipes uses the user id index"""
+        self.assertNoSequentialScan(
+            Recipe.objects.filter(user=self.user).order_by('-id')
+        )
+
+    def test_recipe_filters_use_index(self):
+        """Test tag and ingredient filters search the through tables"""
+        recipes = Recipe.objects.filter(user=self.user)
+        for through, field in ((Recipe.tags.through, 'tag'),
+                               (Recipe.ingredients.through, 'ingredient')):
+            self.assertNoSequentialScan(
+                match_any(recipes, through, field, {1, 2})
+            )
+            self.assertNoSequentialScan(
+                match_all(recipes, through, field, {1, 2})
+            )
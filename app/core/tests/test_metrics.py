@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.middleware import InstrumentationMiddleware
+from core.models import Recipe
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipes:recipe-list')
+TOKEN_URL = reverse('users:token')
+
+
+class HistogramTests(TestCase):
+    """Test the in-process histograms"""
+
+    def test_snapshot_is_cumulative(self):
+        """Test bucket counts include every smaller observation"""
+        histogram = metrics.Histogram((1, 10))
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['sum'], 56.5)
+        self.assertEqual(snapshot['max'], 50)
+        self.assertEqual(snapshot['buckets'],
+                         {'1': 2, '10': 3, '+Inf': 4})
+
+    def test_nested_timer_counted_once(self):
+        """Test re-entering a timer does not double count"""
+        request_metrics = metrics.start_request()
+        try:
+            with metrics.timer('serialize'):
+                with metrics.timer('serialize'):
+                    pass
+        finally:
+            metrics.finish_request()
+
+        self.assertEqual(list(request_metrics.timings), ['serialize'])
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    """Test per view request instrumentation"""
+
+    def setUp(self) -> None:
+        metrics.registry.clear()
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title='Soup',
+                              time_minutes=5, price=5.00)
+
+    def test_server_timing_header(self):
+        """Test responses report query, serializer and render timings"""
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        for name in ('db;dur=', 'serialize;dur=', 'render;dur=',
+                     'total;dur='):
+            self.assertIn(name, timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    def test_metrics_recorded_per_view(self):
+        """Test metrics are aggregated under the view and action name"""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        APIClient().post(TOKEN_URL, {'email': 'ali@test.com',
+                                     'password': 'testpass123'})
+
+        snapshot = metrics.registry.snapshot()
+
+        recipe_list = snapshot['RecipeViewSet.list']
+        self.assertEqual(recipe_list['total_ms']['count'], 2)
+        self.assertGreater(recipe_list['db_queries']['sum'], 0)
+        self.assertGreater(recipe_list['serialize_ms']['sum'], 0)
+        self.assertGreater(recipe_list['render_ms']['sum'], 0)
+        self.assertGreater(recipe_list['response_bytes']['sum'], 0)
+        self.assertIn('CreateTokenView.post', snapshot)
+
+    def test_metrics_endpoint_staff_only(self):
+        """Test only staff users can read the metrics"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint(self):
+        """Test staff users get the aggregated histograms"""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('RecipeViewSet.list', res.data)
+
+    def test_pool_wait_reported(self):
+        """Test time waiting for a pooled connection is reported"""
+        def view(request):
+            metrics.current().add('pool', 0.004)
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request._metrics_view = 'pooled'
+        res = InstrumentationMiddleware(view)(request)
+
+        self.assertTrue(res['Server-Timing'].startswith('pool;dur=4.00'))
+        snapshot = metrics.registry.snapshot()['pooled']
+        self.assertEqual(snapshot['pool_wait_ms']['sum'], 4)
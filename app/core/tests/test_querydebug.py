@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.querydebug import inspect_queries, sql_shape
+from core.testing import QueryCountMixin
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+class QueryDebugTests(QueryCountMixin, TestCase):
+    """Test the slow query log and N+1 detection"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+
+    def _add_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(user=self.user, title=f'R {i}',
+                                           time_minutes=5, price=5.00)
+            recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_sql_shape(self):
+        """Test literals and IN lists are collapsed"""
+        self.assertEqual(
+            sql_shape("SELECT  * FROM t WHERE a = 12 AND b = 'x''y' "
+                      "AND c IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)'
+        )
+
+    def test_repeated_shapes_grouped(self):
+        """Test per row lookups are grouped under one shape"""
+        self._add_recipes(4)
+
+        with inspect_queries() as inspector:
+            for recipe in Recipe.objects.all():
+                list(recipe.tags.all())
+
+        (count, shape), = inspector.repeated(threshold=3)
+        self.assertEqual(count, 4)
+        self.assertIn('core_tag', shape)
+
+    def test_slow_query_stack_recorded(self):
+        """Test queries over the threshold keep the calling stack"""
+        with inspect_queries(slow_ms=0) as inspector:
+            Recipe.objects.count()
+
+        duration, sql, stack = inspector.slow[0]
+        self.assertIn('COUNT', sql)
+        self.assertIn('test_slow_query_stack_recorded', ''.join(stack))
+
+    @override_settings(QUERY_DEBUG=True, NPLUSONE_THRESHOLD=1,
+                       SLOW_QUERY_MS=0)
+    def test_middleware_logs_queries(self):
+        """Test requests log their slow and repeated queries"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('core.querydebug', 'WARNING') as logs:
+            client.get(RECIPES_URL)
+
+        output = '\n'.join(logs.output)
+        self.assertIn('Slow query in RecipeViewSet.list', output)
+        self.assertIn('Possible N+1 in RecipeViewSet.list', output)
+
+    def test_query_count_growth_fails(self):
+        """Test the mixin fails when queries grow with the data"""
+        def n_plus_one():
+            return [list(recipe.tags.all())
+                    for recipe in Recipe.objects.all()]
+
+        with self.assertRaises(AssertionError) as cm:
+            self.assertQueryCountConstant(n_plus_one, self._add_recipes)
+
+        self.assertIn('Query count grew with the data', str(cm.exception))
+        self.assertIn('core_tag', str(cm.exception))
+
+    def test_query_count_constant_passes(self):
+        """Test the mixin returns the result of constant queries"""
+        result = self.assertQueryCountConstant(
+            lambda: Recipe.objects.count(),
+            self._add_recipes
+        )
+
+        self.assertEqual(result, 12)
@@ -0,0 +1,111 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE = ReturnDict([
+    ('id', 1),
+    ('title', 'Crème brûlée \u2028\u2029 "quoted"'),
+    ('tags', [1, 2, 3]),
+    ('ratio', 0.5),
+    ('created', datetime.datetime(2020, 1, 2, 3, 4, 5, 678901,
+                                  tzinfo=datetime.timezone.utc)),
+    ('day', datetime.date(2020, 1, 2)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('label', gettext_lazy('Recipe')),
+    ('nested', {1: None, 'ok': True}),
+], serializer=None)
+
+
+class FastJSONRendererTests(TestCase):
+    """Test the pluggable JSON renderer"""
+
+    def _render_both(self, data):
+        fast = FastJSONRenderer().render(data)
+        with patch.object(renderers, 'orjson', None):
+            stdlib = FastJSONRenderer().render(data)
+        return fast, stdlib
+
+    def test_matches_drf_renderer(self):
+        """Test output is byte identical to DRF's JSONRenderer"""
+        fast, stdlib = self._render_both(SAMPLE)
+
+        self.assertEqual(fast, JSONRenderer().render(SAMPLE))
+        self.assertEqual(stdlib, JSONRenderer().render(SAMPLE))
+
+    def test_decimal_rendered_as_string(self):
+        """Test Decimals are written as exact strings by both encoders"""
+        fast, stdlib = self._render_both({'price': Decimal('5.10')})
+
+        self.assertEqual(fast, b'{"price":"5.10"}')
+        self.assertEqual(stdlib, b'{"price":"5.10"}')
+
+    @override_settings(REST_FRAMEWORK={'COERCE_DECIMAL_TO_STRING': False})
+    def test_decimal_rendered_as_number(self):
+        """Test Decimals are written as numbers when coercion is off"""
+        fast, stdlib = self._render_both({'price': Decimal('5.10')})
+
+        self.assertEqual(fast, b'{"price":5.1}')
+        self.assertEqual(stdlib, b'{"price":5.1}')
+
+    def test_indented_output_uses_stdlib(self):
+        """Test indented output is left to the stdlib encoder"""
+        data = {'price': Decimal('1.00')}
+        ret = FastJSONRenderer().render(
+            data,
+            'application/json; indent=2',
+            {}
+        )
+
+        self.assertEqual(ret, b'{\n  "price": "1.00"\n}')
+
+    def test_none_renders_empty(self):
+        """Test no content renders an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(TestCase):
+    """Test the pluggable JSON parser"""
+
+    def _parse(self, content):
+        return FastJSONParser().parse(BytesIO(content))
+
+    def test_parse(self):
+        """Test both decoders parse the same document"""
+        content = '{"title": "Crème", "tags": [1, 2]}'.encode('utf-8')
+        fast = self._parse(content)
+        with patch.object(parsers, 'orjson', None):
+            stdlib = self._parse(content)
+
+        self.assertEqual(fast, {'title': 'Crème', 'tags': [1, 2]})
+        self.assertEqual(fast, stdlib)
+
+    def test_invalid_json(self):
+        """Test malformed documents raise a parse error"""
+        with self.assertRaises(ParseError):
+            self._parse(b'{"title": ')
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class OrjsonInstalledTests(TestCase):
+    """Test orjson is used when available"""
+
+    def test_renderer_uses_orjson(self):
+        """Test the renderer encodes with orjson"""
+        with patch.object(renderers.orjson, 'dumps',
+                          return_value=b'{}') as dumps:
+            FastJSONRenderer().render({'a': 1})
+
+        dumps.assert_called_once()
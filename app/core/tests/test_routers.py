@@ -0,0 +1,210 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, \
+    override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.middleware import ReplicaPinMiddleware
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+
+
+def separate_replicas():
+    """Return the replicas that are real databases, not test mirrors"""
+    return [alias for alias in settings.REPLICA_DATABASES
+            if not connections[alias].settings_dict['TEST']['MIRROR']]
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.use_replica(None)
+
+    def test_reads_primary_by_default(self):
+        """Test reads outside a replica request go to the primary"""
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_reads_replica_when_chosen(self):
+        """Test reads go to the replica chosen for the request"""
+        routers.use_replica(routers.choose_replica())
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'replica')
+
+    def test_writes_primary(self):
+        """Test writes always go to the primary"""
+        routers.use_replica('replica')
+
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+}}
+MEMCACHED = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    'LOCATION': '127.0.0.1:11211',
+}}
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaPinCacheTests(SimpleTestCase):
+
+    @override_settings(CACHES=LOCMEM, SERVER_PROCESSES=1)
+    def test_local_cache_single_process(self):
+        """Test a single server process may pin users in its own memory"""
+        ReplicaPinMiddleware(lambda request: None)
+
+    @override_settings(CACHES=LOCMEM, SERVER_PROCESSES=3)
+    def test_local_cache_several_processes(self):
+        """Test replicas are refused when processes cannot share pins"""
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaPinMiddleware(lambda request: None)
+
+    @override_settings(CACHES=MEMCACHED, SERVER_PROCESSES=3)
+    def test_shared_cache_several_processes(self):
+        """Test several server processes may pin users in a shared cache"""
+        ReplicaPinMiddleware(lambda request: None)
+
+
+class ReplicaPinTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com', 'testpass123'
+        )
+
+    def test_reads_primary_in_transaction(self):
+        """Test reads inside a transaction see its writes"""
+        routers.use_replica('replica')
+        try:
+            self.assertEqual(routers.ReplicaRouter().db_for_read(Recipe),
+                             'default')
+        finally:
+            routers.use_replica(None)
+
+    @override_settings(REPLICA_PIN_SECONDS=5)
+    def test_pin_to_primary(self):
+        """Test users are pinned to the primary after writing"""
+        self.assertFalse(routers.is_pinned(self.user))
+
+        routers.pin_to_primary(self.user)
+
+        self.assertTrue(routers.is_pinned(self.user))
+
+    @override_settings(REPLICA_DATABASES=['replica'])
+    def test_write_pins_user(self):
+        """Test writing through the API pins the user"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(routers.is_pinned(self.user))
+
+    @override_settings(REPLICA_DATABASES=['replica'])
+    def test_read_does_not_pin_user(self):
+        """Test reading through the API does not pin the user"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        client.get(TAGS_URL)
+
+        self.assertFalse(routers.is_pinned(self.user))
+        self.assertIsNone(routers.current_replica())
+
+
+@skipUnless(separate_replicas(),
+            'Needs a replica database that is not a test mirror, '
+            'run with --settings=app.settings_sqlite')
+class ReplicaReadTests(TransactionTestCase):
+    """Test reads against a primary and a replica holding different rows"""
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        self.replica = separate_replicas()[0]
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com', 'testpass123'
+        )
+        replica_user = get_user_model()(id=self.user.id, email=self.user.email)
+        replica_user.save(using=self.replica)
+        self.primary_recipe = Recipe.objects.create(
+            user=self.user, title='Primary soup', time_minutes=5, price=5
+        )
+        Recipe.objects.using(self.replica).create(
+            user=replica_user, title='Replica salad', time_minutes=5, price=5
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_reads_from_replica(self):
+        """Test safe requests read from the replica"""
+        self.assertEqual(self.titles(), ['Replica salad'])
+
+    def test_read_your_writes(self):
+        """Test users read the primary right after writing"""
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Primary pie', 'time_minutes': 30, 'price': 3
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Recipe.objects.using(self.replica).filter(
+            title='Primary pie'
+        ).exists())
+        self.assertEqual(self.titles(), ['Primary pie', 'Primary soup'])
+
+    def test_pin_expires(self):
+        """Test reads go back to the replica once the pin expires"""
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        cache.delete(routers.pin_key(self.user.pk))
+
+        self.assertEqual(self.titles(), ['Replica salad'])
+
+    def test_other_users_not_pinned(self):
+        """Test one user's write does not pin other users"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpass123'
+        )
+        get_user_model()(id=other.id, email=other.email).save(
+            using=self.replica
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        other_client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(self.titles(), ['Replica salad'])
+        self.assertEqual(Tag.objects.using(self.replica).count(), 0)
+
+    def test_upload_image_reads_primary(self):
+        """Test image status is always read from the primary"""
+        url = reverse('recipes:recipe-upload-image',
+                      args=[self.primary_recipe.id])
+        detail = reverse('recipes:recipe-detail',
+                         args=[self.primary_recipe.id])
+
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(self.client.get(detail).status_code,
+                         status.HTTP_404_NOT_FOUND)
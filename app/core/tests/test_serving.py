@@ -0,0 +1,201 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from django.core.signals import request_finished
+from django.test import SimpleTestCase
+
+from core.asgi import ThreadedWsgiToAsgi
+from core import serving
+
+
+def run_asgi(application, scope, messages=()):
+    """Call an ASGI application and return the messages it sent"""
+    received = [dict(message) for message in messages] or \
+        [{'type': 'http.request', 'body': b''}]
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(application(scope, receive, send))
+    finally:
+        loop.close()
+    return sent
+
+
+def http_scope(path='/'):
+    return {'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'http_version': '1.1',
+            'headers': [(b'host', b'testserver')]}
+
+
+class ServingProfileTests(SimpleTestCase):
+
+    def test_workers_for_sync(self):
+        """Test threaded workers are two per CPU plus one"""
+        self.assertEqual(serving.workers_for(1), 3)
+        self.assertEqual(serving.workers_for(4), 9)
+
+    def test_workers_for_async(self):
+        """Test event loop workers are one per CPU"""
+        self.assertEqual(serving.workers_for(4, 'async'), 4)
+        self.assertEqual(serving.workers_for(0, 'async'), 1)
+
+    def test_workers_capped_by_connections(self):
+        """Test there are never more workers than database connections"""
+        self.assertEqual(serving.workers_for(16, connections=10), 10)
+
+    def test_threads_for(self):
+        """Test threads share the database connections between workers"""
+        self.assertEqual(serving.threads_for(9, 95), 8)
+        self.assertEqual(serving.threads_for(9, 40), 4)
+        self.assertEqual(serving.threads_for(9, 5), 1)
+
+    def test_threads_for_leaves_background_connections(self):
+        """Test task and upload threads count against the connections"""
+        self.assertEqual(serving.threads_for(9, 95, background=2), 8)
+        self.assertEqual(serving.threads_for(9, 40, background=2), 2)
+        self.assertEqual(serving.threads_for(9, 40, background=9), 1)
+
+    def test_background_threads(self):
+        """Test background threads depend on the task queue and mode"""
+        environ = {'TASK_QUEUE_BACKEND': 'thread', 'TASK_QUEUE_WORKERS': '3',
+                   'ASGI_UPLOAD_THREADS': '2'}
+        with patch.dict('os.environ', environ):
+            self.assertEqual(serving.background_threads('sync'), 3)
+            self.assertEqual(serving.background_threads('async'), 5)
+        with patch.dict('os.environ', dict(
+                environ, TASK_QUEUE_BACKEND='immediate')):
+            self.assertEqual(serving.background_threads('async'), 2)
+
+    def test_serving_profile_from_environment(self):
+        """Test the serving profile is configured from the environment"""
+        environ = {'SERVING_MODE': 'async', 'DB_MAX_CONNECTIONS': '45',
+                   'DB_RESERVED_CONNECTIONS': '5',
+                   'TASK_QUEUE_BACKEND': 'thread', 'TASK_QUEUE_WORKERS': '2',
+                   'ASGI_UPLOAD_THREADS': '2'}
+        with patch.dict('os.environ', environ), \
+                patch('core.serving.cpu_count', return_value=4):
+            profile = serving.serving_profile()
+
+        self.assertEqual(profile['worker_class'], serving.ASYNC_WORKER)
+        self.assertEqual(profile['wsgi_app'], 'app.asgi:application')
+        self.assertEqual(profile['workers'], 4)
+        # 10 connections per worker, 2 for tasks and 2 for uploads
+        self.assertEqual(profile['threads'], 6)
+
+    def test_serving_profile_overrides(self):
+        """Test explicit worker and thread counts win"""
+        environ = {'WEB_CONCURRENCY': '2', 'GUNICORN_THREADS': '3'}
+        with patch.dict('os.environ', environ):
+            profile = serving.serving_profile('sync')
+
+        self.assertEqual(profile['worker_class'], serving.SYNC_WORKER)
+        self.assertEqual((profile['workers'], profile['threads']), (2, 3))
+
+    def test_serving_profile_unknown_mode(self):
+        """Test an unknown serving mode is rejected"""
+        with self.assertRaises(ValueError):
+            serving.serving_profile('eventlet')
+
+
+class AsgiApplicationTests(SimpleTestCase):
+
+    def test_asgi_serves_django(self):
+        """Test the ASGI application serves the API"""
+        from app.asgi import application
+        sent = run_asgi(application, http_scope('/api/recipes/tags/'))
+
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 401)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn(b'credentials', body)
+
+    def test_request_finished_sent(self):
+        """Test responses are closed so request_finished is sent"""
+        from app.asgi import application
+        finished = []
+
+        def receiver(**kwargs):
+            finished.append(kwargs)
+
+        request_finished.connect(receiver)
+        self.addCleanup(request_finished.disconnect, receiver)
+        run_asgi(application, http_scope('/api/recipes/tags/'))
+
+        self.assertEqual(len(finished), 1)
+
+    def test_response_closed_on_error(self):
+        """Test the response is closed when sending it fails"""
+        closed = []
+
+        class Response:
+            def __iter__(self):
+                yield b'ok'
+                raise ValueError
+
+            def close(self):
+                closed.append(True)
+
+        def wsgi_app(environ, start_response):
+            start_response('200 OK', [])
+            return Response()
+
+        application = ThreadedWsgiToAsgi(wsgi_app, max_threads=1)
+        self.addCleanup(application.shutdown)
+        with self.assertRaises(ValueError):
+            run_asgi(application, http_scope())
+
+        self.assertEqual(closed, [True])
+
+    def test_requests_run_concurrently(self):
+        """Test requests run on separate threads at the same time"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wsgi_app(environ, start_response):
+            barrier.wait()
+            start_response('200 OK', [('Content-Length', '2')])
+            return [b'ok']
+
+        application = ThreadedWsgiToAsgi(wsgi_app, max_threads=2)
+
+        async def both():
+            return await asyncio.gather(*(
+                application(http_scope(), receive, send)
+                for receive, send in (self._channel(), self._channel())
+            ))
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(both())
+        finally:
+            loop.close()
+        self.assertFalse(barrier.broken)
+
+    def test_lifespan_shuts_down_executor(self):
+        """Test the thread pool is shut down with the worker"""
+        application = ThreadedWsgiToAsgi(lambda *args: [], max_threads=1)
+        sent = run_asgi(application, {'type': 'lifespan'}, (
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ))
+
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+        with self.assertRaises(RuntimeError):
+            application.executor.submit(print)
+
+    def _channel(self):
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            pass
+
+        return receive, send
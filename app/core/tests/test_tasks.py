@@ -0,0 +1,33 @@
+from unittest.mock import Mock
+
+from django.test import TestCase, override_settings
+
+from core.tasks import enqueue
+
+
+class TaskQueueTests(TestCase):
+    """Test the background task queue"""
+
+    @override_settings(TASK_QUEUE_BACKEND='immediate')
+    def test_immediate_backend_runs_inline(self):
+        """Test the immediate backend runs tasks straight away"""
+        task = Mock(__name__='task')
+
+        enqueue(task, 1, key='value')
+
+        task.assert_called_once_with(1, key='value')
+
+    @override_settings(TASK_QUEUE_BACKEND='thread')
+    def test_thread_backend_waits_for_commit(self):
+        """Test the thread backend does not run before the commit"""
+        task = Mock(__name__='task')
+
+        enqueue(task, 1)
+
+        task.assert_not_called()
+
+    @override_settings(TASK_QUEUE_BACKEND='celery')
+    def test_unknown_backend(self):
+        """Test an unknown backend is rejected"""
+        with self.assertRaises(ValueError):
+            enqueue(Mock(__name__='task'))
@@ -0,0 +1,18 @@
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.metrics import registry
+
+
+class MetricsView(APIView):
+    """Report the in-process request metrics histograms to staff"""
+    authentication_classes = (CachedTokenAuthentication,
+                              SessionAuthentication)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return every view's metric histograms"""
+        return Response(registry.snapshot())
@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.db.models import CharField
+        from recipes import signals  # noqa: F401
+        from recipes.lookups import IPrefix
+
+        # Registered here rather than by installing django.contrib.postgres,
+        # whose connection_created handler would run on every connection
+        # checked out of the pool
+        CharField.register_lookup(IPrefix)
+        CharField.register_lookup(TrigramSimilar)
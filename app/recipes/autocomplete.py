@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Q
+
+from recipes.cache import caching_enabled, get_version
+
+
+class PrefixTrie:
+    """Case insensitive prefix trie mapping names to (name, id) entries"""
+
+    def __init__(self, entries=()):
+        self.root = {}
+        for pk, name in entries:
+            self.insert(pk, name)
+
+    def insert(self, pk, name):
+        node = self.root
+        for char in name.lower():
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append((name, pk))
+
+    def complete(self, prefix, limit):
+        """Return up to limit (name, id) entries starting with prefix"""
+        node = self.root
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return []
+
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            results.extend(sorted(node.get(None, ())))
+            stack.extend(node[char] for char in
+                         sorted((key for key in node if key is not None),
+                                reverse=True))
+        return results[:limit]
+
+
+class TrieCache:
+    """Bounded per user cache of tries, rebuilt when the list version moves"""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._tries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, queryset, user_id, scope=''):
+        if not caching_enabled():
+            return PrefixTrie(queryset.values_list('id', 'name'))
+        model = queryset.model
+        key = (model._meta.label_lower, user_id, scope)
+        version = get_version(model, user_id)
+        with self._lock:
+            cached = self._tries.get(key)
+            if cached is not None and cached[0] == version:
+                self._tries.move_to_end(key)
+                return cached[1]
+
+        trie = PrefixTrie(queryset.values_list('id', 'name'))
+        with self._lock:
+            self._tries[key] = (version, trie)
+            self._tries.move_to_end(key)
+            while len(self._tries) > self.max_size:
+                self._tries.popitem(last=False)
+        return trie
+
+    def clear(self):
+        with self._lock:
+            self._tries.clear()
+
+
+trie_cache = TrieCache()
+
+
+def uses_trigram_search():
+    """Return whether the database provides pg_trgm similarity"""
+    return connection.vendor == 'postgresql'
+
+
+def trigram_matches(queryset, text):
+    """Return the rows matching text by prefix or trigrams, best first"""
+    # Both conditions are served by the trigram indexes, fuzzy matches
+    # need pg_trgm.similarity_threshold (0.3 by default). Similarity is
+    # only computed for ranking the rows found.
+    return queryset.filter(
+        Q(name__iprefix=text) | Q(name__trigram_similar=text)
+    ).annotate(
+        similarity=TrigramSimilarity('name', text)
+    ).order_by('-similarity', 'name', 'id')
+
+
+def autocomplete(queryset, user_id, text, limit, scope=''):
+    """Return up to limit {'id', 'name'} matches for text, best first"""
+    if uses_trigram_search():
+        matches = trigram_matches(queryset, text)[:limit]
+        return [{'id': pk, 'name': name}
+                for pk, name in matches.values_list('id', 'name')]
+
+    trie = trie_cache.get(queryset, user_id, scope)
+    return [{'id': pk, 'name': name}
+            for name, pk in trie.complete(text, limit)]
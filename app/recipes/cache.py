@@ -0,0 +1,53 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.serving import cache_is_shared
+
+
+def caching_enabled():
+    """
+    Return whether lists may be cached, which needs every server process
+    to see the version bumps of the others.
+    """
+    return cache_is_shared(settings.CACHES['default']['BACKEND'],
+                           settings.SERVER_PROCESSES)
+
+
+def version_key(model, user_id):
+    """Return the cache key holding a user's list version for model"""
+    return f'recipes:{model._meta.model_name}:{user_id}:version'
+
+
+def get_version(model, user_id):
+    """Return the current list version for a user, creating it if needed"""
+    key = version_key(model, user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version never reuses old keys
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(model, user_id):
+    """Invalidate every cached list of model for a user"""
+    key = version_key(model, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def list_cache_key(model, request):
+    """Return the cache key for a list request at the current version"""
+    user_id = request.user.pk
+    assigned_only = bool(request.query_params.get('assigned_only'))
+    page = hashlib.md5(
+        request.build_absolute_uri().encode('utf-8')
+    ).hexdigest()
+    version = get_version(model, user_id)
+    return (f'recipes:{model._meta.model_name}:{user_id}:{version}:'
+            f'{int(assigned_only)}:{page}')
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def _etag(request, *parts):
+    """Hash the validator parts together with the requested URL"""
+    value = ':'.join(str(part) for part in
+                     (request.user.pk, request.get_full_path()) + parts)
+    return quote_etag(hashlib.md5(value.encode('utf-8')).hexdigest())
+
+
+def list_validators(request, queryset):
+    """
+    Return the ETag of a list of objects. Lists have no Last-Modified:
+    deleting an object leaves the newest remaining updated_at unchanged,
+    only the count in the ETag tells the lists apart.
+    """
+    stats = queryset.order_by().aggregate(
+        count=Count('id'),
+        updated_at=Max('updated_at')
+    )
+    return _etag(request, stats['count'], stats['updated_at'])
+
+
+def detail_validators(request, queryset, pk, related=()):
+    """
+    Return the (etag, last_modified) pair of one object and the related
+    objects it is serialized with, or (None, None) if it does not exist.
+    """
+    try:
+        pk = queryset.model._meta.pk.to_python(pk)
+    except (TypeError, ValueError, ValidationError):
+        # Left to get_object() to answer 404
+        return None, None
+    stats = queryset.filter(pk=pk).order_by().aggregate(
+        count=Count('id'),
+        updated_at=Max('updated_at'),
+        **{f'{name}_updated_at': Max(f'{name}__updated_at')
+           for name in related}
+    )
+    if not stats['count']:
+        return None, None
+    updated_at = max(value for name, value in stats.items()
+                     if name.endswith('updated_at') and value is not None)
+    return _etag(request, updated_at), updated_at
+
+
+def conditional_response(request, etag, last_modified):
+    """Return a 304/412 response if the request's validators match"""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=timestamp
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """Add validator headers to a response"""
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from core.metrics import timer
+
+# Field representations that return database values unchanged
+IDENTITY_REPRESENTATIONS = frozenset((
+    serializers.IntegerField.to_representation,
+    serializers.CharField.to_representation,
+))
+
+
+class FastRecipeSerializer:
+    """
+    Read only serializer building list payloads straight from .values()
+    rows, bypassing per-object ModelSerializer work.
+
+    Field order and representations are taken from serializer_class so
+    the rendered output is identical to it. Many to many ids are read
+    with one query per relation over its through table.
+    """
+    batch_size = 900
+
+    def __init__(self, serializer_class, context=None):
+        declared = serializer_class(context=context or {}).fields
+        model = serializer_class.Meta.model
+        self.columns = ['id']
+        self.relations = {}
+        self.getters = []
+        for name, field in declared.items():
+            if isinstance(field, serializers.ManyRelatedField):
+                m2m = model._meta.get_field(field.source)
+                self.relations[name] = (
+                    m2m.remote_field.through,
+                    m2m.m2m_column_name(),
+                    m2m.m2m_reverse_name()
+                )
+                self.getters.append((name, None, None))
+                continue
+            convert = field.to_representation
+            if convert.__func__ in IDENTITY_REPRESENTATIONS:
+                convert = None
+            self.getters.append((name, field.source, convert))
+            if field.source not in self.columns:
+                self.columns.append(field.source)
+
+    def rows(self, queryset, extra=()):
+        """Return queryset as dict rows holding every column to serialize"""
+        columns = self.columns + [name for name in extra
+                                  if name not in self.columns]
+        return queryset.prefetch_related(None).values(*columns)
+
+    def related_ids(self, recipe_ids):
+        """Return {relation: {recipe id: [related ids]}} in id order"""
+        related = {}
+        for name, (through, source, target) in self.relations.items():
+            grouped = defaultdict(list)
+            for start in range(0, len(recipe_ids), self.batch_size):
+                pairs = through.objects.filter(**{
+                    f'{source}__in': recipe_ids[start:start + self.batch_size]
+                }).order_by(source, target).values_list(source, target)
+                for recipe_id, related_id in pairs:
+                    grouped[recipe_id].append(related_id)
+            related[name] = grouped
+        return related
+
+    def serialize(self, rows):
+        """Return the representation of every row, in order"""
+        with timer('serialize'):
+            return self._serialize(rows)
+
+    def _serialize(self, rows):
+        rows = list(rows)
+        related = self.related_ids([row['id'] for row in rows])
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.getters:
+                if source is None:
+                    item[name] = related[name].get(row['id'], [])
+                    continue
+                value = row[source]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+        return data
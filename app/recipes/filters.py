@@ -0,0 +1,106 @@
+from django.db.models import Count, Exists, OuterRef
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+from recipes.search import search
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def params_to_ints(value):
+    """Convert a comma separated string of ids to a set of integers"""
+    try:
+        ids = {int(str_id) for str_id in value.split(',') if str_id}
+    except ValueError:
+        ids = None
+    if not ids:
+        raise ValidationError(_('Expected a comma separated list of ids.'))
+    return ids
+
+
+def match_any(queryset, through, field, ids):
+    """Keep rows related to at least one of ids, without a JOIN"""
+    related = through.objects.filter(
+        recipe=OuterRef('pk'),
+        **{f'{field}_id__in': ids}
+    )
+    annotation = f'_has_{field}'
+    return queryset.annotate(
+        **{annotation: Exists(related)}
+    ).filter(**{annotation: True})
+
+
+def match_all(queryset, through, field, ids):
+    """Keep rows related to every one of ids using a grouped HAVING COUNT"""
+    recipe_ids = through.objects.filter(
+        **{f'{field}_id__in': ids}
+    ).values('recipe_id').annotate(
+        matched=Count(f'{field}_id')
+    ).filter(matched=len(ids)).values('recipe_id')
+    return queryset.filter(pk__in=recipe_ids)
+
+
+def assigned_to_recipe(queryset):
+    """Keep tags or ingredients used by at least one recipe, without a JOIN"""
+    model = queryset.model
+    related = model.recipe_set.through.objects.filter(
+        **{model._meta.model_name: OuterRef('pk')}
+    )
+    return queryset.annotate(_assigned=Exists(related)).filter(_assigned=True)
+
+
+class RecipeFilterBackend(BaseFilterBackend):
+    """
+    Filter recipes by tag and ingredient ids.
+
+    `?tags=1,2` keeps recipes with any of the tags, `&tags_match=all`
+    keeps recipes with every tag; `ingredients` works the same way. Each
+    filter compiles to a subquery so that no recipe is returned twice.
+    """
+    relations = (
+        ('tags', Recipe.tags.through, 'tag'),
+        ('ingredients', Recipe.ingredients.through, 'ingredient'),
+    )
+    matchers = {
+        MATCH_ANY: match_any,
+        MATCH_ALL: match_all,
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        for param, through, field in self.relations:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            ids = params_to_ints(value)
+            matcher = self.get_matcher(request, f'{param}_match')
+            queryset = matcher(queryset, through, field, ids)
+        return queryset
+
+    def get_matcher(self, request, param):
+        """Return the matcher selected by the given query parameter"""
+        semantics = request.query_params.get(param, MATCH_ANY)
+        try:
+            return self.matchers[semantics]
+        except KeyError:
+            raise ValidationError({
+                param: _('Expected one of: {choices}.').format(
+                    choices=', '.join(self.matchers)
+                )
+            })
+
+
+class RecipeSearchFilterBackend(BaseFilterBackend):
+    """Full text search over recipes with `?search=`, best matches first"""
+    search_param = 'search'
+
+    def get_search_text(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_text(request)
+        if not text:
+            return queryset
+        return search(queryset, text).order_by('-search_rank', '-id')
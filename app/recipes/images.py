@@ -0,0 +1,87 @@
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from core.models import Recipe, RecipeImageRendition
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = (
+    ('thumbnail', (200, 200)),
+    ('medium', (800, 800)),
+)
+RENDITION_FORMATS = (
+    ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+)
+
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: (Image.FLIP_LEFT_RIGHT,),
+    3: (Image.ROTATE_180,),
+    4: (Image.FLIP_TOP_BOTTOM,),
+    5: (Image.TRANSPOSE,),
+    6: (Image.ROTATE_270,),
+    7: (Image.TRANSVERSE,),
+    8: (Image.ROTATE_90,),
+}
+
+
+def normalize_orientation(image):
+    """Return the image rotated as described by its EXIF orientation"""
+    try:
+        exif = image._getexif() or {}
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        exif = {}
+    for method in ORIENTATION_TRANSPOSE.get(exif.get(EXIF_ORIENTATION), ()):
+        image = image.transpose(method)
+    return image
+
+
+def render(image, size, image_format, options):
+    """Return a resized copy of image encoded in image_format"""
+    copy = image.copy()
+    copy.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    copy.save(buffer, format=image_format, **options)
+    return copy.size, buffer.getvalue()
+
+
+def process_recipe_image(recipe_id):
+    """Create the resized renditions of a recipe's uploaded image"""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+
+    try:
+        with recipe.image.open('rb') as original:
+            image = Image.open(original)
+            image.load()
+        image = normalize_orientation(image).convert('RGB')
+
+        for rendition in recipe.renditions.all():
+            rendition.file.delete(save=False)
+        recipe.renditions.all().delete()
+
+        for name, size in RENDITION_SIZES:
+            for image_format, ext, options in RENDITION_FORMATS:
+                (width, height), content = render(
+                    image, size, image_format, options
+                )
+                rendition = RecipeImageRendition(
+                    recipe=recipe,
+                    name=name,
+                    format=ext,
+                    width=width,
+                    height=height
+                )
+                rendition.file.save(f'{name}.{ext}', ContentFile(content))
+        status = Recipe.IMAGE_READY
+    except Exception:
+        # Anything left uncaught would keep the image pending forever
+        logger.exception('Could not process image of recipe %s', recipe_id)
+        status = Recipe.IMAGE_FAILED
+
+    Recipe.objects.filter(pk=recipe_id).update(image_status=status)
@@ -0,0 +1,19 @@
+from django.db.models import Lookup
+
+
+class IPrefix(Lookup):
+    """
+    Case insensitive prefix match written as ILIKE, which the trigram
+    indexes can serve, unlike the UPPER() LIKE of istartswith.
+    """
+    lookup_name = 'iprefix'
+
+    def process_rhs(self, compiler, connection):
+        rhs, params = super().process_rhs(compiler, connection)
+        return rhs, [connection.ops.prep_for_like_query(param) + '%'
+                     for param in params]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', lhs_params + rhs_params
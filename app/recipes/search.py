@@ -0,0 +1,179 @@
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVector
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, TextField, Value, When
+
+from core.models import Recipe
+
+SEARCH_CONFIG = 'english'
+
+# Weights of the title, tag/ingredient names and description, matching
+# the default weights Postgres gives to the A, B and C labels
+FIELD_WEIGHTS = (('A', 1.0), ('B', 0.4), ('C', 0.2))
+
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with',
+))
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def uses_postgres_search():
+    """Return whether the database supports stored tsvector search"""
+    return connection.vendor == 'postgresql'
+
+
+def document_vector(names):
+    """Return the weighted search vector of a recipe and its related names"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(Value(' '.join(names), output_field=TextField()),
+                     weight='B', config=SEARCH_CONFIG) +
+        SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the stored search vectors of the given recipes"""
+    if not uses_postgres_search() or not recipe_ids:
+        return
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).only('id') \
+        .prefetch_related('tags', 'ingredients')
+    for recipe in recipes:
+        names = [obj.name for obj in recipe.tags.all()] + \
+            [obj.name for obj in recipe.ingredients.all()]
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_vector=document_vector(names)
+        )
+
+
+class IndexOnCommit:
+    """On commit callback refreshing the search vectors of recipe_ids"""
+
+    def __init__(self):
+        self.recipe_ids = set()
+
+    def __call__(self):
+        update_search_vectors(sorted(self.recipe_ids))
+
+
+def index_on_commit(recipe_ids):
+    """
+    Refresh the search vectors of recipes once the transaction commits.
+
+    Every save and relation change of a recipe asks for this, so the ids
+    of one transaction are collected into a single callback and each
+    recipe is indexed once.
+    """
+    if not uses_postgres_search() or not recipe_ids:
+        return
+    pending = next((func for sids, func in connection.run_on_commit
+                    if isinstance(func, IndexOnCommit)), None)
+    if pending is not None:
+        pending.recipe_ids.update(recipe_ids)
+        return
+    pending = IndexOnCommit()
+    pending.recipe_ids.update(recipe_ids)
+    transaction.on_commit(pending)
+
+
+def backfill_search_vectors(min_id, max_id):
+    """Compute the search vectors of a range of recipes with one UPDATE"""
+    if not uses_postgres_search():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE core_recipe SET search_vector =
+                setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+                    SELECT string_agg(name, ' ') FROM (
+                        SELECT t.name FROM core_tag t
+                        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+                        WHERE rt.recipe_id = core_recipe.id
+                        UNION ALL
+                        SELECT i.name FROM core_ingredient i
+                        JOIN core_recipe_ingredients ri
+                            ON ri.ingredient_id = i.id
+                        WHERE ri.recipe_id = core_recipe.id
+                    ) names
+                ), '')), 'B') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', description), 'C')
+            WHERE id BETWEEN %s AND %s
+        """, [min_id, max_id])
+
+
+def tokenize(text):
+    """Split text into lower case terms, dropping stop words"""
+    terms = []
+    for word in WORD_RE.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def build_index(queryset):
+    """
+    Build an in-memory inverted index of the recipes in queryset.
+
+    Maps every term to {recipe id: weight}, keeping the highest weight
+    of the fields a term appears in.
+    """
+    index = defaultdict(dict)
+
+    def add(recipe_id, text, weight):
+        for term in tokenize(text or ''):
+            postings = index[term]
+            postings[recipe_id] = max(postings.get(recipe_id, 0), weight)
+
+    weights = dict(FIELD_WEIGHTS)
+    rows = queryset.order_by().values_list('id', 'title', 'description')
+    for recipe_id, title, description in rows:
+        add(recipe_id, title, weights['A'])
+        add(recipe_id, description, weights['C'])
+    for field, name in (('tags', 'tag__name'),
+                        ('ingredients', 'ingredient__name')):
+        through = getattr(Recipe, field).through
+        related = through.objects.filter(
+            recipe__in=queryset.order_by().values('id')
+        ).values_list('recipe_id', name)
+        for recipe_id, text in related:
+            add(recipe_id, text, weights['B'])
+    return index
+
+
+def rank(index, text):
+    """Return {recipe id: rank} for recipes containing every term of text"""
+    terms = tokenize(text)
+    if not terms:
+        return {}
+    matches = None
+    for term in terms:
+        postings = index.get(term, {})
+        matches = set(postings) if matches is None else matches & set(postings)
+    return {recipe_id: sum(index[term][recipe_id] for term in terms)
+            for recipe_id in matches}
+
+
+def search(queryset, text):
+    """Filter recipes matching text, annotated with a search_rank"""
+    if uses_postgres_search():
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+    ranks = rank(build_index(queryset), text)
+    if not ranks:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.filter(pk__in=ranks).annotate(search_rank=Case(
+        *[When(pk=pk, then=Value(score)) for pk, score in ranks.items()],
+        output_field=FloatField()
+    ))
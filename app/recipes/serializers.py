@@ -1,33 +1,166 @@
+from collections import OrderedDict
+
+from django.db import connection, transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.settings import api_settings
+
+from core.metrics import TimedListSerializer, TimedSerializerMixin
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition
+from recipes.cache import bump_version
+from recipes.search import index_on_commit
+
+
+def bulk_insert(model, objs):
+    """Insert objs with as few queries as the database allows"""
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+class BulkListSerializer(TimedListSerializer):
+    """List serializer that creates and updates user owned objects in bulk"""
+    max_items = 1000
 
-from core.models import Tag, Ingredient, Recipe
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > self.max_items:
+            message = _('Expected at most {max_items} items.').format(
+                max_items=self.max_items
+            )
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            }, code='max_items')
+        return super().to_internal_value(data)
 
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            objs = bulk_insert(model, [model(**attrs)
+                                       for attrs in validated_data])
+            # After commit, so no list is cached from the old rows under
+            # the new version
+            transaction.on_commit(self.invalidate)
+        return objs
 
-class TagSerializer(serializers.ModelSerializer):
+    def update(self, instances, validated_data):
+        with transaction.atomic():
+            for instance, attrs in zip(instances, validated_data):
+                for attr, value in attrs.items():
+                    setattr(instance, attr, value)
+                instance.save()
+            transaction.on_commit(self.invalidate)
+        return instances
+
+    def invalidate(self):
+        """Invalidate cached lists that signals did not cover"""
+        bump_version(self.child.Meta.model, self.context['request'].user.pk)
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Tag Objects"""
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Ingredient Objects"""
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
+
+
+class UserOwnedManyRelatedField(serializers.ManyRelatedField):
+    """Many related field resolving every submitted id with one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
 
+        child = self.child_relation
+        pks, errors = [], []
+        for item in data:
+            try:
+                pks.append(int(item))
+            except (TypeError, ValueError):
+                errors.append(child.error_messages['incorrect_type'].format(
+                    data_type=type(item).__name__
+                ))
+        objs = child.get_queryset().in_bulk(set(pks)) if pks else {}
+        errors.extend(
+            child.error_messages['does_not_exist'].format(pk_value=pk)
+            for pk in dict.fromkeys(pks) if pk not in objs
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [objs[pk] for pk in dict.fromkeys(pks)]
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the request user"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+
+class SparseFieldsMixin:
+    """
+    Limit output to the names in context['fields'] and nest the related
+    objects named in context['expand'] instead of listing their ids.
+    """
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if requested:
+            fields = OrderedDict((name, field)
+                                 for name, field in fields.items()
+                                 if name in requested)
+        for name in self.context.get('expand', ()):
+            if name in fields and name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name](
+                    many=True,
+                    read_only=True
+                )
+        return fields
+
+
+class RecipeSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                       serializers.ModelSerializer):
     """Serializer for Recipe Objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -37,6 +170,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
                   'price', 'link', 'description')
         read_only_fields = ('id',)
+        list_serializer_class = TimedListSerializer
+
+    def create(self, validated_data):
+        # One transaction, so the recipe and its relations are indexed once
+        with transaction.atomic():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            return super().update(instance, validated_data)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -45,10 +188,121 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeBulkListSerializer(BulkListSerializer):
+    """
+    Create and update recipes in bulk.
+
+    Related ids of every item are checked with one query per relation
+    and written straight to the through tables.
+    """
+    relations = (('tags', Tag), ('ingredients', Ingredient))
+
+    def to_internal_value(self, data):
+        validated = super().to_internal_value(data)
+        user = self.context['request'].user
+        errors = [{} for _ in validated]
+        message = serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ]
+
+        for field, model in self.relations:
+            ids = {pk for attrs in validated for pk in attrs.get(field, ())}
+            found = set(model.objects.filter(
+                user=user,
+                id__in=ids
+            ).values_list('id', flat=True)) if ids else set()
+            for item_errors, attrs in zip(errors, validated):
+                missing = sorted(set(attrs.get(field, ())) - found)
+                if missing:
+                    item_errors[field] = [message.format(pk_value=pk)
+                                          for pk in missing]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    def create(self, validated_data):
+        relations = self._pop_relations(validated_data)
+        with transaction.atomic():
+            recipes = super().create(validated_data)
+            self._set_relations(recipes, relations, replace=False)
+            # bulk_create sends no post_save to index the recipes
+            index_on_commit([recipe.id for recipe in recipes])
+        return recipes
+
+    def update(self, instances, validated_data):
+        relations = self._pop_relations(validated_data)
+        with transaction.atomic():
+            recipes = super().update(instances, validated_data)
+            # Indexed on commit by the post_save of every recipe
+            self._set_relations(recipes, relations, replace=True)
+        return recipes
+
+    def invalidate(self):
+        user_id = self.context['request'].user.pk
+        for field, model in self.relations:
+            bump_version(model, user_id)
+
+    def _pop_relations(self, validated_data):
+        return [{field: attrs.pop(field) for field, model in self.relations
+                 if field in attrs} for attrs in validated_data]
+
+    def _set_relations(self, recipes, relations, replace):
+        """Write the through table rows of every recipe in bulk"""
+        for field, model in self.relations:
+            through = getattr(Recipe, field).through
+            column = f'{model._meta.model_name}_id'
+            changed = [(recipe, related[field])
+                       for recipe, related in zip(recipes, relations)
+                       if field in related]
+            if replace and changed:
+                through.objects.filter(
+                    recipe_id__in=[recipe.id for recipe, ids in changed]
+                ).delete()
+            through.objects.bulk_create(
+                through(recipe_id=recipe.id, **{column: pk})
+                for recipe, ids in changed for pk in dict.fromkeys(ids)
+            )
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """Serializer for validating recipes written in bulk"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = RecipeBulkListSerializer
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """Serializer for the ids of objects deleted in bulk"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+
+
+class RecipeImageRenditionSerializer(serializers.ModelSerializer):
+    """Serializer for resized copies of a recipe image"""
+    url = serializers.ImageField(source='file', read_only=True)
+
+    class Meta:
+        model = RecipeImageRendition
+        fields = ('name', 'format', 'width', 'height', 'url')
+        read_only_fields = fields
+
+
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    renditions = RecipeImageRenditionSerializer(many=True, read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'renditions')
+        read_only_fields = ('id', 'image_status')
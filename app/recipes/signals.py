@@ -0,0 +1,102 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, \
+    m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.cache import bump_version
+from recipes.search import index_on_commit, uses_postgres_search
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_attr_lists(sender, instance, **kwargs):
+    """Invalidate the owner's cached lists when a tag or ingredient changes"""
+    bump_version(sender, instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_assigned_lists(sender, instance, action, model, **kwargs):
+    """Invalidate assigned_only lists when recipe relations change"""
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Recipe):
+        bump_version(model, instance.user_id)
+    else:
+        bump_version(type(instance), instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_lists(sender, instance, **kwargs):
+    """Invalidate assigned_only lists when a recipe is deleted"""
+    bump_version(Tag, instance.user_id)
+    bump_version(Ingredient, instance.user_id)
+
+
+def touch_recipes(queryset):
+    """Mark recipes as modified without loading them"""
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_related_recipes(sender, instance, action, pk_set, **kwargs):
+    """Bump updated_at of recipes whose tags or ingredients changed"""
+    if isinstance(instance, Recipe):
+        if action.startswith('post_'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        touch_recipes(instance.recipe_set.all())
+    elif action.startswith('post_') and pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_tagged_recipes(sender, instance, **kwargs):
+    """Bump updated_at of recipes losing a tag that is being deleted"""
+    recipes = Recipe.objects.filter(tags=instance)
+    touch_recipes(recipes)
+    reindex_recipes(recipes)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_with_ingredient(sender, instance, **kwargs):
+    """Bump updated_at of recipes losing an ingredient being deleted"""
+    recipes = Recipe.objects.filter(ingredients=instance)
+    touch_recipes(recipes)
+    reindex_recipes(recipes)
+
+
+def reindex_recipes(queryset):
+    """Refresh search vectors of recipes once the transaction commits"""
+    if uses_postgres_search():
+        index_on_commit(list(queryset.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    """Refresh the search vector of a saved recipe"""
+    index_on_commit([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_related_recipes(sender, instance, action, pk_set, **kwargs):
+    """Refresh search vectors of recipes whose tags or ingredients changed"""
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Recipe):
+        index_on_commit([instance.pk])
+    elif pk_set:
+        index_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_recipes(sender, instance, created, **kwargs):
+    """Refresh search vectors of recipes using a renamed tag or ingredient"""
+    if not created:
+        reindex_recipes(instance.recipe_set.all())
@@ -0,0 +1,40 @@
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def iter_chunks(queryset, chunk_size):
+    """Yield lists of chunk_size objects read through a server side cursor"""
+    iterator = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_serialized(queryset, serializer_class, prefetches=(),
+                    chunk_size=500, context=None):
+    """Yield serialized objects, prefetching relations one chunk at a time"""
+    queryset = queryset.prefetch_related(None)
+    for chunk in iter_chunks(queryset, chunk_size):
+        prefetch_related_objects(chunk, *prefetches)
+        serializer = serializer_class(chunk, many=True, context=context)
+        yield from serializer.data
+
+
+def stream_json_array(items):
+    """Encode items as the chunks of a single JSON array"""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    yield '['
+    for index, item in enumerate(items):
+        yield (',' if index else '') + encoder.encode(item)
+    yield ']'
+
+
+def stream_ndjson(items):
+    """Encode items as newline delimited JSON"""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for item in items:
+        yield encoder.encode(item) + '\n'
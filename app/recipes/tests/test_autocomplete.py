@@ -0,0 +1,147 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipes.autocomplete import PrefixTrie, autocomplete, \
+    trigram_matches, trie_cache
+
+TAG_AUTOCOMPLETE_URL = reverse('recipes:tag-autocomplete')
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipes:ingredient-autocomplete')
+TAGS_URL = reverse('recipes:tag-list')
+
+
+class PrefixTrieTests(TestCase):
+    """Test the in-memory prefix trie"""
+
+    def test_complete_is_case_insensitive_and_sorted(self):
+        """Test completions ignore case and come back in name order"""
+        trie = PrefixTrie([(1, 'Salt'), (2, 'salmon'), (3, 'Sage'),
+                           (4, 'Pepper')])
+
+        self.assertEqual(trie.complete('SAL', 10),
+                         [('salmon', 2), ('Salt', 1)])
+        self.assertEqual(trie.complete('s', 2), [('Sage', 3), ('salmon', 2)])
+        self.assertEqual(trie.complete('x', 10), [])
+
+
+class TrigramQueryTests(SimpleTestCase):
+    """Test the PostgreSQL autocomplete query can use the trigram indexes"""
+
+    def test_trigram_query_uses_indexed_operators(self):
+        """Test names are matched with ILIKE and %, not per row functions"""
+        postgres = DatabaseWrapper({
+            'NAME': 'recipes', 'USER': '', 'PASSWORD': '', 'HOST': '',
+            'PORT': '', 'OPTIONS': {}, 'TIME_ZONE': None,
+            'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True,
+        })
+        sql, params = trigram_matches(
+            Tag.objects.all(), '50%_off'
+        ).query.get_compiler(connection=postgres).as_sql()
+        where = sql[sql.index(' WHERE '):sql.index(' ORDER BY ')]
+
+        self.assertIn('"core_tag"."name" ILIKE %s', where)
+        self.assertIn('"core_tag"."name" %% %s', where)
+        self.assertNotIn('UPPER', where)
+        self.assertNotIn('SIMILARITY', where)
+        self.assertIn('50\\%\\_off%', params)
+
+
+class AutocompleteApiTests(TestCase):
+    """Test the tag and ingredient autocomplete endpoints"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        trie_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _names(self, url, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_autocomplete_matches_prefix(self):
+        """Test matching names are returned up to the limit"""
+        for name in ('Salt', 'Salmon', 'Sage', 'Pepper'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        self.assertEqual(
+            self._names(INGREDIENT_AUTOCOMPLETE_URL, q='sal'),
+            ['Salmon', 'Salt']
+        )
+        self.assertEqual(
+            self._names(INGREDIENT_AUTOCOMPLETE_URL, prefix='s', limit=1),
+            ['Sage']
+        )
+
+    def test_autocomplete_limited_to_user(self):
+        """Test other users' tags are never suggested"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpass123'
+        )
+        Tag.objects.create(user=other, name='Vegan')
+        Tag.objects.create(user=self.user, name='Vegetarian')
+
+        self.assertEqual(self._names(TAG_AUTOCOMPLETE_URL, q='veg'),
+                         ['Vegetarian'])
+
+    def test_create_invalidates_trie(self):
+        """Test a newly created tag is suggested straight away"""
+        self.assertEqual(self._names(TAG_AUTOCOMPLETE_URL, q='veg'), [])
+
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(self._names(TAG_AUTOCOMPLETE_URL, q='veg'),
+                         ['Vegan'])
+
+    def test_cached_trie_skips_database(self):
+        """Test repeated lookups are answered from the cached trie"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self._names(TAG_AUTOCOMPLETE_URL, q='v')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._names(TAG_AUTOCOMPLETE_URL, q='ve'),
+                             ['Vegan'])
+
+    def test_empty_query_returns_nothing(self):
+        """Test a blank query returns an empty list"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertEqual(self._names(TAG_AUTOCOMPLETE_URL, q=' '), [])
+
+    def test_invalid_limit(self):
+        """Test a non integer limit is rejected"""
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'v', 'limit': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_latency(self):
+        """Test cached lookups stay well under 10ms at the 99th percentile"""
+        Tag.objects.bulk_create([
+            Tag(user=self.user, name=f'Tag {index:04d}')
+            for index in range(2000)
+        ])
+        queryset = Tag.objects.filter(user=self.user)
+        autocomplete(queryset, self.user.pk, 'tag', 10)
+
+        timings = []
+        for index in range(100):
+            start = time.perf_counter()
+            autocomplete(queryset, self.user.pk, f'tag {index:02d}', 10)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        self.assertLess(timings[98], 0.01)
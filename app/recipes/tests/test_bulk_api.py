@@ -0,0 +1,247 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.serializers import RecipeBulkSerializer
+
+RECIPES_BULK_URL = reverse('recipes:recipe-bulk')
+TAGS_BULK_URL = reverse('recipes:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipes:ingredient-bulk')
+
+
+def recipe_payload(title, **params):
+    """Return a payload for one recipe"""
+    payload = {'title': title, 'time_minutes': 10, 'price': '5.00'}
+    payload.update(params)
+    return payload
+
+
+class BulkAPITests(TestCase):
+    """Test the bulk create, update and delete endpoints"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating several recipes with relations in one request"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        payload = [
+            recipe_payload('Kale Salad', tags=[tag.id],
+                           ingredients=[ingredient.id]),
+            recipe_payload('Tofu Curry', tags=[tag.id, tag.id]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in res.data],
+                         ['Kale Salad', 'Tofu Curry'])
+        self.assertEqual(res.data[0]['ingredients'], [ingredient.id])
+        self.assertEqual(res.data[1]['tags'], [tag.id])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test invalid items are reported at their index, nothing saved"""
+        foreign_tag = Tag.objects.create(user=self.other, name='Vegan')
+        payload = [
+            recipe_payload('Kale Salad'),
+            recipe_payload('Tofu Curry', tags=[foreign_tag.id]),
+            recipe_payload(''),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+        payload[2] = recipe_payload('Fish')
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_validation_query_count_constant(self):
+        """Test related ids are checked with one query per relation"""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}')
+                for i in range(10)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Item {i}')
+            for i in range(10)
+        ]
+        payload = [
+            recipe_payload(f'Recipe {i}',
+                           tags=[tag.id for tag in tags],
+                           ingredients=[item.id for item in ingredients])
+            for i in range(20)
+        ]
+        request = Request(APIRequestFactory().post(RECIPES_BULK_URL))
+        request.user = self.user
+        serializer = RecipeBulkSerializer(data=payload, many=True,
+                                          context={'request': request})
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating several recipes at once"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe_one = Recipe.objects.create(user=self.user, title='Salad',
+                                           time_minutes=5, price=5)
+        recipe_two = Recipe.objects.create(user=self.user, title='Curry',
+                                           time_minutes=5, price=5)
+        recipe_two.tags.add(tag)
+        payload = [
+            {'id': recipe_one.id, 'title': 'Kale Salad', 'tags': [tag.id]},
+            {'id': recipe_two.id, 'tags': []},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe_one.refresh_from_db()
+        self.assertEqual(recipe_one.title, 'Kale Salad')
+        self.assertEqual(list(recipe_one.tags.all()), [tag])
+        self.assertFalse(recipe_two.tags.exists())
+
+    def test_bulk_update_unknown_ids(self):
+        """Test updating recipes of another user is reported per item"""
+        recipe = Recipe.objects.create(user=self.other, title='Salad',
+                                       time_minutes=5, price=5)
+
+        res = self.client.patch(RECIPES_BULK_URL,
+                                [{'id': recipe.id, 'title': 'Mine'}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+
+    def test_bulk_update_duplicate_ids(self):
+        """Test updating the same recipe twice is reported per item"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(user=self.user, title='Salad',
+                                       time_minutes=5, price=5)
+
+        res = self.client.patch(RECIPES_BULK_URL, [
+            {'id': recipe.id, 'tags': [tag.id]},
+            {'id': recipe.id, 'tags': [tag.id]},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_update_invalid_ids(self):
+        """Test ids that are not numbers are reported per item"""
+        res = self.client.patch(RECIPES_BULK_URL, [
+            {'id': [1], 'title': 'Salad'}, {'title': 'Curry'}
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        self.assertIn('id', res.data[1])
+
+    def test_bulk_update_boolean_ids(self):
+        """Test JSON booleans are not taken for the ids 1 and 0"""
+        tag = Tag.objects.create(id=1, user=self.user, name='Vegan')
+
+        res = self.client.patch(TAGS_BULK_URL, [{'id': True, 'name': 'Y'}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting several recipes, ignoring other users' recipes"""
+        mine = Recipe.objects.create(user=self.user, title='Salad',
+                                     time_minutes=5, price=5)
+        theirs = Recipe.objects.create(user=self.other, title='Curry',
+                                       time_minutes=5, price=5)
+
+        res = self.client.delete(RECIPES_BULK_URL,
+                                 {'ids': [mine.id, theirs.id]},
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], [mine.id])
+        self.assertEqual(res.data['not_found'], [theirs.id])
+        self.assertTrue(Recipe.objects.filter(id=theirs.id).exists())
+        self.assertFalse(Recipe.objects.filter(id=mine.id).exists())
+
+    def test_bulk_create_and_update_tags(self):
+        """Test tags and ingredients can be written in bulk"""
+        res = self.client.post(TAGS_BULK_URL,
+                               [{'name': 'Vegan'}, {'name': 'Dessert'}],
+                               format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+        payload = [{'id': res.data[0]['id'], 'name': 'Vegetarian'}]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.data[0]['name'], 'Vegetarian')
+
+        res = self.client.post(INGREDIENTS_BULK_URL, [{'name': ''}],
+                               format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data[0])
+
+    def test_bulk_create_too_many_items(self):
+        """Test the number of items per request is capped"""
+        payload = [{'name': f'Tag {i}'} for i in range(1001)]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+
+class BulkInvalidationTests(TransactionTestCase):
+    """Test bulk writes invalidate cached lists once they commit"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_invalidates_after_commit(self):
+        """Test lists are invalidated after the bulk create commits"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        in_transaction = []
+
+        def bump_version(model, user_id):
+            in_transaction.append(connection.in_atomic_block)
+
+        with patch('recipes.serializers.bump_version', bump_version):
+            res = self.client.post(RECIPES_BULK_URL, [
+                recipe_payload('Kale Salad', tags=[tag.id])
+            ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(in_transaction, [False, False])
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+TAGS_URL = reverse('recipes:tag-list')
+INGREDIENTS_URL = reverse('recipes:ingredient-list')
+
+
+class AttrListCacheTests(TestCase):
+    """Test caching of the tag and ingredient lists"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Coriander eggs on toast',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def _names(self, url, params=None):
+        res = self.client.get(url, params)
+        return [item['name'] for item in res.data['results']]
+
+    def test_cache_hit_skips_database(self):
+        """Test a repeated list is served without queries"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first.data, second.data)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+    }}, SERVER_PROCESSES=3, REPLICA_DATABASES=[])
+    def test_local_cache_several_processes_not_used(self):
+        """Test lists are not cached where other processes miss bumps"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        # A write made by another server process bumps its own cache only
+        Tag.objects.filter(user=self.user).update(name='Vegetarian')
+
+        self.assertEqual(self._names(TAGS_URL), ['Vegetarian'])
+
+    def test_create_invalidates_list(self):
+        """Test creating a tag through the API invalidates the list"""
+        self.assertEqual(self._names(TAGS_URL), [])
+
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(self._names(TAGS_URL), ['Vegan'])
+
+    def test_delete_invalidates_list(self):
+        """Test deleting an ingredient invalidates the list"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        self.assertEqual(self._names(INGREDIENTS_URL), ['Kale'])
+
+        ingredient.delete()
+
+        self.assertEqual(self._names(INGREDIENTS_URL), [])
+
+    def test_recipe_relations_invalidate_assigned_list(self):
+        """Test changing recipe tags invalidates assigned only lists"""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        params = {'assigned_only': 1}
+        self.assertEqual(self._names(TAGS_URL, params), [])
+
+        self.recipe.tags.add(tag)
+        self.assertEqual(self._names(TAGS_URL, params), ['Breakfast'])
+
+        self.recipe.delete()
+        self.assertEqual(self._names(TAGS_URL, params), [])
+
+    def test_lists_cached_per_user(self):
+        """Test users never see each other's cached lists"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self._names(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpass123'
+        )
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self._names(TAGS_URL), [])
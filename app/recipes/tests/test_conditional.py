@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+class ConditionalRecipeAPITests(TestCase):
+    """Test ETag and Last-Modified handling of the recipe API"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Ginger Prawns',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def test_list_not_modified(self):
+        """Test a list matching the client's ETag returns 304"""
+        res = self.client.get(RECIPES_URL)
+        self.assertIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL,
+                                  HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_if_modified_since_after_delete(self):
+        """Test a list revalidated by date only is resent after a delete"""
+        older = Recipe.objects.create(user=self.user, title='Curry',
+                                      time_minutes=10, price=5.00)
+        Recipe.objects.filter(pk=older.pk).update(
+            updated_at=self.recipe.updated_at - timedelta(days=1)
+        )
+        since = http_date(self.recipe.updated_at.timestamp() + 1)
+        older.delete()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=since)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_modified(self):
+        """Test changing or adding recipes changes the list ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        self.recipe.title = 'Ginger Tofu'
+        self.recipe.save()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        Recipe.objects.create(user=self.user, title='Curry',
+                              time_minutes=10, price=5.00)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_detail_not_modified(self):
+        """Test a recipe matching the client's ETag returns 304"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_by_related_objects(self):
+        """Test changing tags of a recipe changes its ETag"""
+        tag = Tag.objects.create(user=self.user, name='Asian')
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        self.recipe.tags.add(tag)
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        tag.name = 'Thai'
+        tag.save()
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Thai')
+
+        tag.delete()
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_detail_not_found(self):
+        """Test a missing recipe still returns 404"""
+        res = self.client.get(detail_url(self.recipe.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_invalid_id(self):
+        """Test a recipe id that is not a number returns 404"""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.fastpath import FastRecipeSerializer
+from recipes.serializers import RecipeSerializer
+from recipes.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+class FastRecipeSerializerTests(TestCase):
+    """Test the values() based recipe list serializer"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Dessert', 'Quick')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Kale', 'Salt')]
+        for index in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {index} é',
+                time_minutes=index,
+                price='5.5',
+                link='https://example.com' if index % 2 else '',
+                description='Stir "well"\n' * index
+            )
+            recipe.tags.add(*tags[index % 3:])
+            recipe.ingredients.add(*ingredients[:index % 3])
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_output_identical_to_model_serializer(self):
+        """Test the fast path renders the same bytes as RecipeSerializer"""
+        queryset = Recipe.objects.order_by('-id')
+        expected = RecipeSerializer(queryset, many=True).data
+
+        serializer = FastRecipeSerializer(RecipeSerializer)
+        data = serializer.serialize(serializer.rows(queryset))
+
+        self.assertEqual(self._render(data), self._render(expected))
+
+    def test_sparse_output_identical(self):
+        """Test the fast path honours the requested fields"""
+        context = {'fields': frozenset(('id', 'price', 'tags'))}
+        queryset = Recipe.objects.order_by('id')
+        expected = RecipeSerializer(queryset, many=True,
+                                    context=context).data
+
+        serializer = FastRecipeSerializer(RecipeSerializer, context=context)
+        data = serializer.serialize(serializer.rows(queryset))
+
+        self.assertEqual(self._render(data), self._render(expected))
+
+    def test_one_query_per_relation(self):
+        """Test rows and related ids are read with three queries"""
+        serializer = FastRecipeSerializer(RecipeSerializer)
+
+        with self.assertNumQueries(3):
+            serializer.serialize(serializer.rows(Recipe.objects.all()))
+
+    def test_api_list_matches_model_serializer(self):
+        """Test the list endpoint output matches the slow path"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        fast = client.get(RECIPES_URL)
+        with patch.object(RecipeViewSet, 'use_fast_serializer', False):
+            slow = client.get(RECIPES_URL)
+
+        self.assertEqual(fast.content, slow.content)
@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.test import TestCase
+
+from recipes.images import normalize_orientation, render
+
+
+class ImageProcessingTests(TestCase):
+    """Test the recipe image processing helpers"""
+
+    def test_normalize_orientation_rotates(self):
+        """Test images are rotated according to their EXIF orientation"""
+        image = Image.new('RGB', (20, 10))
+        with patch.object(image, '_getexif', create=True,
+                          return_value={0x0112: 6}):
+            rotated = normalize_orientation(image)
+
+        self.assertEqual(rotated.size, (10, 20))
+
+    def test_normalize_orientation_without_exif(self):
+        """Test images without EXIF data are left untouched"""
+        image = Image.new('RGB', (20, 10))
+
+        self.assertEqual(normalize_orientation(image).size, (20, 10))
+
+    def test_render_keeps_aspect_ratio(self):
+        """Test renditions fit the size box and keep the aspect ratio"""
+        image = Image.new('RGB', (1000, 500))
+
+        size, content = render(image, (200, 200), 'WEBP', {})
+
+        self.assertEqual(size, (200, 100))
+        self.assertEqual(content[8:12], b'WEBP')
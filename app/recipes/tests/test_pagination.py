@@ -0,0 +1,112 @@
+import json
+from base64 import b64encode
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Tag, Recipe
+from recipes.pagination import KeysetCursorPagination
+
+TAGS_URL = reverse('recipes:tag-list')
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the recipe API lists"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, params):
+        """Follow next links from url and return every page"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_tags_paginated_on_name_and_id(self):
+        """Test paging through tags with duplicate names skips nothing"""
+        for name in ['Vegan', 'Vegan', 'Dessert', 'Vegan', 'Brunch']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self._walk(TAGS_URL, {'page_size': 2})
+
+        ids = [tag['id'] for page in pages for tag in page['results']]
+        expected = Tag.objects.order_by('-name', 'id')
+        self.assertEqual(ids, [tag.id for tag in expected])
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_prior_page(self):
+        """Test the previous link returns the page before"""
+        for i in range(5):
+            Recipe.objects.create(user=self.user, title=f'Recipe {i}',
+                                  time_minutes=5, price=5)
+
+        first = self.client.get(RECIPES_URL, {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        previous = self.client.get(second['previous']).data
+
+        self.assertEqual(previous['results'], first['results'])
+        self.assertIsNone(previous['previous'])
+
+    def test_page_size_capped(self):
+        """Test that the requested page size is capped server side"""
+        paginator = KeysetCursorPagination()
+        paginator.max_page_size = 2
+        request = Request(
+            APIRequestFactory().get(TAGS_URL, {'page_size': 50})
+        )
+
+        self.assertEqual(paginator.get_page_size(request), 2)
+
+    def test_no_count_or_offset_queries(self):
+        """Test that paging does not count rows or use offsets"""
+        for i in range(4):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+        first = self.client.get(TAGS_URL, {'page_size': 2}).data
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_cursor_with_invalid_values(self):
+        """Test that a cursor holding wrongly typed values returns 404"""
+        for position in (['Vegan', 'abc'], ['Vegan', None], ['Vegan', [1]]):
+            cursor = b64encode(
+                json.dumps({'p': position, 'r': 0}).encode('utf-8')
+            ).decode('ascii')
+
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        cursor = b64encode(b'{"p": ["abc"], "r": 0}').decode('ascii')
+        res = self.client.get(RECIPES_URL, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor returns not found"""
+        res = self.client.get(TAGS_URL, {'cursor': 'garbage'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,19 +1,23 @@
 import tempfile
+import json
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryCountMixin
 from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipes:recipe-list')
+EXPORT_URL = reverse('recipes:recipe-export')
 
 
 def upload_image_url(recipe_id):
@@ -48,6 +52,16 @@ def sample_recipe(user, **params):
     return Recipe.objects.create(user=user, **defaults)
 
 
+def sample_recipes_with_relations(user, count):
+    """Create count recipes, each with its own tag and ingredient"""
+    for i in range(count):
+        recipe = sample_recipe(user=user, title=f'Recipe {i}')
+        recipe.tags.add(sample_tag(user=user, name=f'Tag {i}'))
+        recipe.ingredients.add(
+            sample_ingredient(user=user, name=f'Ingredient {i}')
+        )
+
+
 class PublicRecipeAPITests(TestCase):
     """Test unauthenicated recipe API access"""
 
@@ -60,7 +74,7 @@ class PublicRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeAPITests(TestCase):
+class PrivateRecipeAPITests(QueryCountMixin, TestCase):
     """Test authenticated API Access"""
 
     def setUp(self) -> None:
@@ -82,7 +96,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for User"""
@@ -98,8 +112,8 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
 
     def test_view_recipe_detail(self):
         """Test viewing recipe detail"""
@@ -113,6 +127,61 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeDetailSerializer(recipe)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_recipes_query_count_constant(self):
+        """Test listing recipes does not issue queries per recipe"""
+        res = self.assertQueryCountConstant(
+            lambda: self.client.get(RECIPES_URL),
+            lambda count: sample_recipes_with_relations(self.user, count),
+            sizes=(2, 12)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_view_recipe_detail_query_count(self):
+        """Test viewing recipe detail prefetches tags and ingredients"""
+        recipe = sample_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_export_recipes_json_array(self):
+        """Test streaming every recipe as a JSON array"""
+        sample_recipes_with_relations(self.user, 3)
+        sample_recipe(get_user_model().objects.create_user(
+            'other@test.com',
+            'testpass123'
+        ))
+
+        res = self.client.get(EXPORT_URL)
+        content = json.loads(b''.join(res.streaming_content))
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(content, json.loads(json.dumps(serializer.data)))
+
+    def test_export_recipes_ndjson(self):
+        """Test streaming recipes as newline delimited JSON in chunks"""
+        sample_recipes_with_relations(self.user, 5)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(EXPORT_URL, {'ndjson': 1})
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['title'], 'Recipe 4')
+
     def test_create_basic_recipe(self):
         """Test creating a basic recipe"""
         payload = {
@@ -172,6 +241,53 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(ingredient_one, ingredients)
         self.assertIn(ingredient_two, ingredients)
 
+    def test_create_recipe_related_query_count_constant(self):
+        """Test related ids are resolved with a fixed number of queries"""
+        ingredients = []
+
+        def add_ingredients(count):
+            for i in range(count):
+                ingredients.append(sample_ingredient(
+                    user=self.user,
+                    name=f'Item {len(ingredients)}'
+                ).id)
+
+        res = self.assertQueryCountConstant(
+            lambda: self.client.post(RECIPES_URL, {
+                'title': 'Stew',
+                'time_minutes': 30,
+                'price': 5,
+                'ingredients': ingredients
+            }),
+            add_ingredients,
+            sizes=(2, 40)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['ingredients']), 40)
+
+    def test_create_recipe_foreign_related_ids(self):
+        """Test ids of other users' tags are rejected together"""
+        user2 = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpass123'
+        )
+        own_tag = sample_tag(user=self.user)
+        foreign_one = sample_tag(user=user2, name='Vegan')
+        foreign_two = sample_tag(user=user2, name='Dessert')
+        payload = {
+            'title': 'Chocolate Cheese Cake',
+            'time_minutes': 30,
+            'price': 5,
+            'tags': [own_tag.id, foreign_one.id, foreign_two.id, 9999]
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertFalse(Recipe.objects.exists())
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -213,6 +329,7 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipe.tags.all().count(), 0)
 
 
+@override_settings(TASK_QUEUE_BACKEND='immediate')
 class RecipeImageUploadTests(TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -222,6 +339,8 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self) -> None:
+        for rendition in self.recipe.renditions.all():
+            rendition.file.delete()
         self.recipe.image.delete()
 
     def test_upload_image_to_recipe(self):
@@ -236,10 +355,62 @@ class RecipeImageUploadTests(TestCase):
                                    format='multipart')
             self.recipe.refresh_from_db()
 
-            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
             self.assertIn('image', res.data)
+            self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
             self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_creates_renditions(self):
+        """Test uploaded images are resized in the background"""
+        url = upload_image_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (1600, 1200))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(url, {'image': ntf}, format='multipart')
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        renditions = {(r['name'], r['format']): r
+                      for r in res.data['renditions']}
+        self.assertEqual(set(renditions), {
+            ('thumbnail', 'jpg'), ('thumbnail', 'webp'),
+            ('medium', 'jpg'), ('medium', 'webp'),
+        })
+        medium = renditions[('medium', 'webp')]
+        self.assertEqual((medium['width'], medium['height']), (800, 600))
+        self.assertTrue(medium['url'].endswith('.webp'))
+        for rendition in self.recipe.renditions.all():
+            self.assertTrue(os.path.exists(rendition.file.path))
+
+    def test_upload_image_hides_old_renditions(self):
+        """Test a new upload is not answered with the old renditions"""
+        url = upload_image_url(self.recipe.id)
+        for _ in range(2):
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+                Image.new('RGB', (1600, 1200)).save(ntf, format='JPEG')
+                ntf.seek(0)
+                res = self.client.post(url, {'image': ntf},
+                                       format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertEqual(res.data['renditions'], [])
+
+    def test_upload_image_unexpected_error(self):
+        """Test images failing to process for any reason are failed"""
+        url = upload_image_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with patch('recipes.images.render', side_effect=MemoryError), \
+                    self.assertLogs('recipes.images', 'ERROR'):
+                self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = upload_image_url(self.recipe.id)
@@ -271,9 +442,9 @@ class RecipeImageUploadTests(TestCase):
         serializer_two = RecipeSerializer(recipe_two)
         serializer_three = RecipeSerializer(recipe_three)
 
-        self.assertIn(serializer_one.data, res.data)
-        self.assertIn(serializer_two.data, res.data)
-        self.assertNotIn(serializer_three.data, res.data)
+        self.assertIn(serializer_one.data, res.data['results'])
+        self.assertIn(serializer_two.data, res.data['results'])
+        self.assertNotIn(serializer_three.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Returning recipes with specific ingredients"""
@@ -301,6 +472,77 @@ class RecipeImageUploadTests(TestCase):
         serializer_two = RecipeSerializer(recipe_two)
         serializer_three = RecipeSerializer(recipe_three)
 
-        self.assertIn(serializer_one.data, res.data)
-        self.assertIn(serializer_two.data, res.data)
-        self.assertNotIn(serializer_three.data, res.data)
+        self.assertIn(serializer_one.data, res.data['results'])
+        self.assertIn(serializer_two.data, res.data['results'])
+        self.assertNotIn(serializer_three.data, res.data['results'])
+
+    def test_filter_recipes_by_tags_no_duplicates(self):
+        """Test recipes matching several tags are returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag_one = sample_tag(user=self.user, name='Vegan')
+        tag_two = sample_tag(user=self.user, name='Dessert')
+        recipe.tags.add(tag_one, tag_two)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag_one.id},{tag_two.id}'}
+        )
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test filtering recipes that have every requested tag"""
+        recipe_one = sample_recipe(user=self.user, title='Vegan Cake')
+        recipe_two = sample_recipe(user=self.user, title='Vegan Curry')
+        tag_one = sample_tag(user=self.user, name='Vegan')
+        tag_two = sample_tag(user=self.user, name='Dessert')
+        recipe_one.tags.add(tag_one, tag_two)
+        recipe_two.tags.add(tag_one)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag_one.id},{tag_two.id}', 'tags_match': 'all'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'],
+                         [RecipeSerializer(recipe_one).data])
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        """Test combining tag and ingredient filters"""
+        recipe_one = sample_recipe(user=self.user, title='Ginger Prawns')
+        recipe_two = sample_recipe(user=self.user, title='Ginger Tofu')
+        tag = sample_tag(user=self.user, name='Asian')
+        ginger = sample_ingredient(user=self.user, name='Ginger')
+        prawns = sample_ingredient(user=self.user, name='Prawns')
+        recipe_one.tags.add(tag)
+        recipe_two.tags.add(tag)
+        recipe_one.ingredients.add(ginger, prawns)
+        recipe_two.ingredients.add(ginger)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': f'{tag.id}',
+            'ingredients': f'{ginger.id},{prawns.id}',
+            'ingredients_match': 'all',
+        })
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe_one.id)
+
+    def test_filter_recipes_empty_params(self):
+        """Test empty filters are ignored, as blank form fields"""
+        res = self.client.get(RECIPES_URL, {'tags': '', 'ingredients': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid ids or match semantics return a bad request"""
+        res = self.client.get(RECIPES_URL, {'tags': 'one,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'ingredients': ','})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'tags_match': 'x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,189 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.search import tokenize
+
+RECIPES_URL = reverse('recipes:recipe-list')
+RECIPES_BULK_URL = reverse('recipes:recipe-bulk')
+TAGS_BULK_URL = reverse('recipes:tag-bulk')
+
+
+def sample_recipe(user, title, **params):
+    """Create and return a sample Recipe"""
+    return Recipe.objects.create(user=user, title=title, time_minutes=10,
+                                 price=5.00, **params)
+
+
+class RecipeSearchTests(TestCase):
+    """Test full text search over recipes"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPES_URL, dict(search=text, **params))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_search_ranks_title_above_description(self):
+        """Test title matches rank above description matches"""
+        in_description = sample_recipe(self.user, 'Stew',
+                                       description='Hearty ginger stew')
+        in_title = sample_recipe(self.user, 'Ginger Prawns')
+        sample_recipe(self.user, 'Fish and Chips')
+
+        data = self._search('ginger')
+
+        self.assertEqual([item['id'] for item in data['results']],
+                         [in_title.id, in_description.id])
+
+    def test_search_tag_and_ingredient_names(self):
+        """Test recipes are found through their tag and ingredient names"""
+        recipe_one = sample_recipe(self.user, 'Curry')
+        recipe_one.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe_two = sample_recipe(self.user, 'Salad')
+        recipe_two.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Kale')
+        )
+
+        self.assertEqual([item['id'] for item in
+                          self._search('vegan')['results']], [recipe_one.id])
+        self.assertEqual([item['id'] for item in
+                          self._search('kale')['results']], [recipe_two.id])
+
+    def test_search_requires_every_term(self):
+        """Test only recipes containing every search term are returned"""
+        match = sample_recipe(self.user, 'Thai Green Curry')
+        sample_recipe(self.user, 'Thai Salad')
+
+        data = self._search('green thai')
+
+        self.assertEqual([item['id'] for item in data['results']],
+                         [match.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are never returned"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpass123'
+        )
+        sample_recipe(other, 'Ginger Prawns')
+
+        self.assertEqual(self._search('ginger')['results'], [])
+
+    def test_search_paginated_by_rank(self):
+        """Test ranked results page without repeating recipes"""
+        for i in range(3):
+            sample_recipe(self.user, f'Curry {i}')
+            sample_recipe(self.user, f'Stew {i}', description='curry style')
+
+        first = self._search('curry', page_size=4)
+        second = self.client.get(first['next']).data
+        ids = [item['id'] for item in first['results'] + second['results']]
+
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(len(set(ids)), 6)
+        self.assertTrue(all(item['title'].startswith('Curry')
+                            for item in first['results'][:3]))
+
+
+class SearchIndexTests(TransactionTestCase):
+    """Test stored search vectors are refreshed once changes commit"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+    def test_search_vector_maintained(self):
+        """Test the stored search vector follows recipe changes"""
+        recipe = sample_recipe(self.user, 'Curry')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        self.assertTrue(Recipe.objects.filter(search_vector='vegan').exists())
+
+        tag.name = 'Spicy'
+        tag.save()
+        self.assertTrue(Recipe.objects.filter(search_vector='spicy').exists())
+
+        tag.delete()
+        self.assertFalse(Recipe.objects.filter(search_vector='spicy').exists())
+
+    @patch('recipes.signals.uses_postgres_search', return_value=True)
+    @patch('recipes.search.uses_postgres_search', return_value=True)
+    @patch('recipes.search.update_search_vectors')
+    def test_create_indexes_once(self, update, *mocks):
+        """Test creating a recipe with relations indexes it once"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Curry', 'time_minutes': 10, 'price': 5.00,
+            'tags': [tag.id], 'ingredients': [ingredient.id],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        update.assert_called_once_with([res.data['id']])
+
+    @patch('recipes.signals.uses_postgres_search', return_value=True)
+    @patch('recipes.search.uses_postgres_search', return_value=True)
+    @patch('recipes.search.update_search_vectors')
+    def test_bulk_update_indexes_once(self, update, *mocks):
+        """Test updating recipes in bulk indexes them once"""
+        recipes = [sample_recipe(self.user, title)
+                   for title in ('Curry', 'Salad')]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        update.reset_mock()
+
+        res = self.client.patch(RECIPES_BULK_URL, [
+            {'id': recipe.id, 'tags': [tag.id]} for recipe in recipes
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        update.assert_called_once_with(sorted(r.id for r in recipes))
+
+    @patch('recipes.signals.uses_postgres_search', return_value=True)
+    @patch('recipes.search.uses_postgres_search', return_value=True)
+    @patch('recipes.search.update_search_vectors')
+    def test_deleted_names_unindexed(self, update, *mocks):
+        """Test deleting tags or ingredients in bulk reindexes recipes"""
+        recipe = sample_recipe(self.user, 'Curry')
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Spicy')]
+        recipe.tags.add(*tags)
+        update.reset_mock()
+
+        res = self.client.delete(TAGS_BULK_URL,
+                                 {'ids': [tag.id for tag in tags]},
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        update.assert_called_once_with([recipe.id])
+
+
+class TokenizeTests(TestCase):
+    """Test the fallback search tokenizer"""
+
+    def test_tokenize(self):
+        """Test text is lower cased, plurals trimmed and stop words dropped"""
+        self.assertEqual(tokenize('The Prawns and Ginger, with RICE'),
+                         ['prawn', 'ginger', 'rice'])
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """Test ?fields= and ?expand= on the recipe endpoints"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'ali@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Kale')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Kale salad',
+            time_minutes=10,
+            price=5.00,
+            description='A very long description'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_list_selected_fields(self):
+        """Test only the requested fields are returned"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': self.recipe.id, 'title': 'Kale salad'}
+        ])
+
+    def test_unrequested_columns_not_read(self):
+        """Test unrequested columns and relations are not queried"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertNotIn('core_recipe_ingredients', sql)
+
+    def test_expand_nests_related_objects(self):
+        """Test expanded relations are nested instead of listed by id"""
+        res = self.client.get(RECIPES_URL, {
+            'fields': 'id,tags,ingredients',
+            'expand': 'tags'
+        })
+
+        self.assertEqual(res.data['results'], [{
+            'id': self.recipe.id,
+            'ingredients': [self.ingredient.id],
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+        }])
+
+    def test_retrieve_selected_fields(self):
+        """Test a recipe detail honours ?fields="""
+        res = self.client.get(detail_url(self.recipe.id),
+                              {'fields': 'title,tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'title': 'Kale salad',
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+        })
+
+    def test_unknown_field_rejected(self):
+        """Test unknown field names are rejected"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fields_ignored_on_write(self):
+        """Test a create still returns the full representation"""
+        res = self.client.post(RECIPES_URL + '?fields=id', {
+            'title': 'Soup',
+            'time_minutes': 20,
+            'price': 3.00,
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tags'], [self.tag.id])
+        self.assertIn('title', res.data)
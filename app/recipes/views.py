@@ -1,29 +1,179 @@
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 
-from core.models import Tag, Ingredient, Recipe
+from core.authentication import CachedTokenAuthentication
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition
+from core.routers import ReplicaReadMixin
+from core.tasks import enqueue
+from recipes.autocomplete import autocomplete
+from recipes.cache import caching_enabled, list_cache_key
+from recipes.fastpath import FastRecipeSerializer
+from recipes.conditional import list_validators, detail_validators, \
+    conditional_response, set_validators
+from recipes.filters import RecipeFilterBackend, \
+    RecipeSearchFilterBackend, assigned_to_recipe
+from recipes.images import process_recipe_image
+from recipes.pagination import KeysetCursorPagination
+from recipes.streaming import iter_serialized, stream_json_array, \
+    stream_ndjson
 from recipes.serializers import IngredientSerializer, \
-    TagSerializer, RecipeSerializer, \
-    RecipeDetailSerializer, RecipeImageSerializer
+    TagSerializer, RecipeSerializer, RecipeBulkSerializer, \
+    RecipeDetailSerializer, RecipeImageSerializer, BulkDeleteSerializer
+
+
+class BulkModelMixin:
+    """Create, update and delete lists of user owned objects at once"""
+    bulk_serializer_class = None
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False)
+    def bulk(self, request):
+        """Dispatch a bulk request on its HTTP method"""
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        kwargs['context'] = self.get_serializer_context()
+        return self.bulk_serializer_class(*args, many=True, **kwargs)
+
+    def bulk_create(self, request):
+        """Create every object in the request body in one transaction"""
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        objs = serializer.save(user=request.user)
+        return self.get_bulk_response(objs, status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        """Partially update every object in the request body by id"""
+        if not isinstance(request.data, list):
+            raise ValidationError(_('Expected a list of items.'))
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in request.data]
+        # JSON true and false would pass as the ids 1 and 0
+        ids = [pk if isinstance(pk, int) and not isinstance(pk, bool)
+               else None for pk in ids]
+        existing = self.get_queryset().prefetch_related(None).in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+        seen = set()
+        errors = []
+        for pk in ids:
+            if pk not in existing:
+                errors.append({'id': [_('Not found.')]})
+            elif pk in seen:
+                errors.append({'id': [_('Duplicate id.')]})
+            else:
+                errors.append({})
+                seen.add(pk)
+        if any(errors):
+            raise ValidationError(errors)
+
+        serializer = self.get_bulk_serializer(
+            [existing[pk] for pk in ids],
+            data=request.data,
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        objs = serializer.save()
+        return self.get_bulk_response(objs, status.HTTP_200_OK)
 
+    def bulk_destroy(self, request):
+        """Delete the objects listed in the request body"""
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+        queryset = self.get_queryset().prefetch_related(None)
+        deleted = set(queryset.filter(id__in=ids).values_list(
+            'id', flat=True
+        ))
+        queryset.model.objects.filter(id__in=deleted).delete()
+        return Response({
+            'deleted': sorted(deleted),
+            'not_found': sorted(ids - deleted),
+        }, status=status.HTTP_200_OK)
+
+    def get_bulk_response(self, objs, status_code):
+        """Serialize objs with the view's serializer, in request order"""
+        position = {obj.id: index for index, obj in enumerate(objs)}
+        queryset = self.get_queryset().filter(id__in=position)
+        instances = sorted(queryset, key=lambda obj: position[obj.id])
+        serializer = self.get_serializer(instances, many=True)
+        return Response(serializer.data, status=status_code)
+
+
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base View Set for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetCursorPagination
+    ordering = ('-name', 'id')
+    cache_timeout = 300
+    autocomplete_limit = 10
+    max_autocomplete_limit = 50
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list for this request, filling it on a miss"""
+        if not caching_enabled():
+            return super().list(request, *args, **kwargs)
+        key = list_cache_key(self.queryset.model, request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, self.cache_timeout)
+        return response
+
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the names best matching ?q= (or ?prefix=), best first"""
+        text = request.query_params.get('q') or \
+            request.query_params.get('prefix') or ''
+        text = text.strip()
+        if not text:
+            return Response([])
+
+        try:
+            limit = int(request.query_params.get(
+                'limit', self.autocomplete_limit
+            ))
+        except ValueError:
+            raise ValidationError({
+                'limit': [_('A valid integer is required.')]
+            })
+        limit = max(1, min(limit, self.max_autocomplete_limit))
+
+        assigned_only = bool(request.query_params.get('assigned_only'))
+        return Response(autocomplete(
+            self.get_queryset().order_by(),
+            request.user.pk,
+            text,
+            limit,
+            scope=str(int(assigned_only))
+        ))
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         assigned_only = bool(self.request.query_params.get('assigned_only'))
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=self.request.user).order_by('-name')
+            queryset = assigned_to_recipe(queryset)
+        return queryset.filter(user=self.request.user).order_by(*self.ordering)
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -34,40 +184,168 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """Manage Tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    bulk_serializer_class = TagSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage Ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    bulk_serializer_class = IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, BulkModelMixin,
+                    viewsets.ModelViewSet):
     """Manage Recipes in the Database"""
     serializer_class = RecipeSerializer
+    bulk_serializer_class = RecipeBulkSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    def _params_to_ints(self, qs):
-        """Convert a list of string ids to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = KeysetCursorPagination
+    filter_backends = (RecipeFilterBackend, RecipeSearchFilterBackend)
+    ordering = ('-id',)
+    search_ordering = ('-search_rank', '-id')
+    export_chunk_size = 500
+    use_fast_serializer = True
+    relations = (('tags', Tag), ('ingredients', Ingredient))
+    sparse_actions = ('list', 'retrieve', 'export')
+    # Image processing status is written in the background
+    primary_actions = ('upload_image',)
+    # Actions served natively under ASGI and their thread pool lanes,
+    # see core.asgi
+    async_actions = {'list': 'orm', 'retrieve': 'orm',
+                     'upload_image': 'upload'}
 
     def get_queryset(self):
         """Limit objects to authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        fields = self.get_sparse_fields()[0]
+        if fields:
+            queryset = self.queryset.only(*self._get_columns(fields))
+        else:
+            queryset = self.queryset.defer('search_vector')
+        queryset = queryset.prefetch_related(*self._get_prefetches())
+        return queryset.filter(user=self.request.user).order_by(*self.ordering)
+
+    def get_sparse_fields(self):
+        """Return the (fields, expand) names selected by a read request"""
+        if self.request.method not in SAFE_METHODS or \
+                self.action not in self.sparse_actions:
+            return frozenset(), frozenset()
+        available = self.serializer_class.Meta.fields
+        fields = self._parse_names('fields', available)
+        expand = self._parse_names('expand', dict(self.relations))
+        return fields, expand
+
+    def _parse_names(self, param, available):
+        """Convert a comma separated query parameter to a set of names"""
+        value = self.request.query_params.get(param, '')
+        names = frozenset(name.strip() for name in value.split(',')
+                          if name.strip())
+        unknown = sorted(names.difference(available))
+        if unknown:
+            raise ValidationError({param: [
+                _('Unknown field: {name}.').format(name=name)
+                for name in unknown
+            ]})
+        return names
+
+    def _get_columns(self, fields):
+        """Return the concrete model columns needed to serialize fields"""
+        columns = ['id']
+        for name in fields:
+            field = self.queryset.model._meta.get_field(name)
+            if field.concrete and not field.many_to_many:
+                columns.append(name)
+        return columns
+
+    def get_serializer_context(self):
+        """Pass the requested sparse fields on to the serializer"""
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.get_sparse_fields()
+        return context
+
+    def get_ordering(self):
+        """Return the ordering the paginator should key pages on"""
+        if RecipeSearchFilterBackend().get_search_text(self.request):
+            return self.search_ordering
+        return self.ordering
+
+    def _get_prefetches(self):
+        """Return the related lookups the current action serializes"""
+        if self.action == 'upload_image':
+            if self.request.method in SAFE_METHODS:
+                return ('renditions',)
+            # An upload replaces the renditions, so none are loaded for it
+            return (Prefetch(
+                'renditions',
+                queryset=RecipeImageRendition.objects.none()
+            ),)
+        fields, expand = self.get_sparse_fields()
+        prefetches = []
+        for name, model in self.relations:
+            if fields and name not in fields:
+                continue
+            if self.action == 'retrieve' or name in expand:
+                prefetches.append(name)
+            else:
+                prefetches.append(Prefetch(
+                    name,
+                    queryset=model.objects.only('id').order_by('id')
+                ))
+        return tuple(prefetches)
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, answering 304 if the client's copy is current"""
+        etag = list_validators(
+            request,
+            self.filter_queryset(self.get_queryset())
+        )
+        response = conditional_response(request, etag, None)
+        if response is None and self.can_use_fast_serializer():
+            response = self.fast_list(request)
+        elif response is None:
+            response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, None)
 
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+    def can_use_fast_serializer(self):
+        """Return whether the list can skip ModelSerializer instances"""
+        return self.use_fast_serializer and \
+            self.get_serializer_class() is RecipeSerializer and \
+            not self.get_sparse_fields()[1]
 
-        if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+    def fast_list(self, request):
+        """List recipes by serializing .values() rows directly"""
+        serializer = FastRecipeSerializer(
+            self.get_serializer_class(),
+            context=self.get_serializer_context()
+        )
+        ordering = [field.lstrip('-') for field in self.get_ordering()]
+        rows = serializer.rows(
+            self.filter_queryset(self.get_queryset()),
+            extra=ordering
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(serializer.serialize(rows))
+        return self.get_paginated_response(serializer.serialize(page))
 
-        return queryset.filter(user=self.request.user)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 if the client's copy is current"""
+        fields = self.get_sparse_fields()[0]
+        etag, last_modified = detail_validators(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            kwargs[self.lookup_field],
+            related=tuple(name for name, model in self.relations
+                          if not fields or name in fields)
+        )
+        response = None
+        if etag:
+            response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
 
     def get_serializer_class(self):
         """:return appropriate serializer class"""
@@ -77,23 +355,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeImageSerializer
         return self.serializer_class
 
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream every matching recipe as a JSON array or as NDJSON"""
+        items = iter_serialized(
+            self.filter_queryset(self.get_queryset()),
+            self.get_serializer_class(),
+            prefetches=self._get_prefetches(),
+            chunk_size=self.export_chunk_size,
+            context=self.get_serializer_context()
+        )
+
+        if request.query_params.get('ndjson'):
+            return StreamingHttpResponse(
+                stream_ndjson(items),
+                content_type='application/x-ndjson'
+            )
+        return StreamingHttpResponse(
+            stream_json_array(items),
+            content_type='application/json'
+        )
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['GET', 'POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """Upload an image to a recipe, or report its processing status"""
         recipe = self.get_object()
+        if request.method == 'GET':
+            return Response(self.get_serializer(recipe).data)
+
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(image_status=Recipe.IMAGE_PENDING)
+            data = serializer.data
+            enqueue(process_recipe_image, recipe.id)
             return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
+                data,
+                status=status.HTTP_202_ACCEPTED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
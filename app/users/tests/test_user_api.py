@@ -1,5 +1,6 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 
 
@@ -85,6 +86,45 @@ class PublicUserAPITests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_create_token_rehashes_password(self):
+        """Test logging in rehashes the password with the preferred hasher"""
+        payload = {
+            'email': 'ali@test.com',
+            'password': 'testpass'
+        }
+        user = create_user(**payload)
+        user.password = make_password(payload['password'], hasher='md5')
+        user.save()
+
+        res = self.client.post(TOKEN_URL, payload)
+        user.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password(payload['password']))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_create_token_invalid_credentials_keeps_hash(self):
+        """Test a failed login does not rehash the password"""
+        user = create_user(email='ali@test.com', password='testpass')
+        user.password = make_password('testpass', hasher='md5')
+        user.save()
+
+        self.client.post(TOKEN_URL, {
+            'email': 'ali@test.com',
+            'password': 'wrongpass'
+        })
+        user.refresh_from_db()
+
+        self.assertTrue(user.password.startswith('md5$'))
+
     def test_create_token_no_user(self):
         payload = {
             'email': 'ali@test.com',